@@ -0,0 +1,51 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from settings import settings
+from display import DisplayManager
+
+
+def _run(manager, updates, full_redraw):
+    # 模拟回放线程的进度更新，统计写出的字节数与耗时
+    out = io.StringIO()
+    stdout, sys.stdout = sys.stdout, out
+    try:
+        manager.render()
+        start_bytes = manager.bytes_written
+        start = time.perf_counter()
+        for i in range(updates):
+            if full_redraw:
+                manager.invalidate()
+            manager.update_progress(i, updates)
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+    return (manager.bytes_written - start_bytes) / updates, elapsed / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes and time per progress update: full redraw vs. diff rendering")
+    parser.add_argument('--updates', type=int, default=10000)
+    args = parser.parse_args()
+
+    results = {'updates': args.updates}
+    for name, full in (('full_redraw', True), ('diff', False)):
+        manager = DisplayManager()
+        manager.set_hotkeys(settings.config['hotkeys'])
+        per_update_bytes, per_update_time = _run(manager, args.updates, full)
+        results[name] = {
+            'bytes_per_update': round(per_update_bytes, 1),
+            'us_per_update': round(per_update_time * 1e6, 2),
+        }
+    results['bytes_reduction'] = round(results['full_redraw']['bytes_per_update'] / results['diff']['bytes_per_update'], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def build_dicts(n):
+    # 旧版录制器的存储方式：每个事件一个字典
+    events = []
+    for i in range(n):
+        events.append({'type': 'move', 'time': i * 0.016, 'x': 100 + i % 1820, 'y': 100 + i % 980})
+    return events
+
+
+def build_store(n):
+    data = macrofile.MacroData()
+    for i in range(n):
+        data.append(i * 0.016, macrofile.MOVE, 100 + i % 1820, 100 + i % 980)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprint of dict events vs. the columnar MacroData store")
+    parser.add_argument('--events', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    _, dict_bytes = _measure(lambda: build_dicts(args.events))
+    _, store_bytes = _measure(lambda: build_store(args.events))
+    print(json.dumps({
+        'events': args.events,
+        'dict_bytes': dict_bytes,
+        'store_bytes': store_bytes,
+        'dict_bytes_per_event': round(dict_bytes / args.events, 1),
+        'store_bytes_per_event': round(store_bytes / args.events, 1),
+        'reduction': round(dict_bytes / max(1, store_bytes), 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
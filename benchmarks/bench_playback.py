@@ -0,0 +1,213 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不报告峰值内存
+    resource = None
+
+import macrofile
+from backends import NullBackend
+from plan import PlaybackPlan
+from settings import settings
+from timing import TIMING_MODES
+
+# 默认场景: (事件数, 宏内事件密度 events/s, 回放速度)；每个场景的实际回放时长约 5 秒
+SCENARIOS = [(10_000, 2_000, 1.0), (100_000, 10_000, 2.0), (1_000_000, 50_000, 4.0)]
+# 测量最大可持续速率时使用的回放速度，所有截止时间都立即到期 (不合并移动)
+SATURATION_SPEED = 1e9
+
+
+class CostlyNullBackend(NullBackend):
+    """记录调用的 NullBackend，每次调用忙等 call_cost 秒，模拟真实后端注入一次输入的耗时。"""
+
+    def __init__(self, call_cost=0.0):
+        super().__init__()
+        self.call_cost = call_cost
+
+    def _log(self, method, args):
+        now = time.perf_counter()
+        self.calls.append((now, method, args))
+        if self.call_cost:
+            end = now + self.call_cost
+            while time.perf_counter() < end:
+                pass
+
+
+def synthetic_macro(events, rate):
+    # 以移动为主，夹杂点击、滚轮与按键，事件间隔在 rate 附近抖动
+    data = macrofile.MacroData()
+    step = 1.0 / rate
+    t = 0.0
+    for i in range(events):
+        t += step * (0.5 + (i * 7919 % 100) / 100)
+        m = i % 50
+        if m == 10:
+            data.append(t, macrofile.CLICK, 400, 300, 'left', True)
+        elif m == 11:
+            data.append(t, macrofile.CLICK, 400, 300, 'left', False)
+        elif m == 20:
+            data.append(t, macrofile.SCROLL, 400, 300, dx=0, dy=-1)
+        elif m == 30:
+            data.append(t, macrofile.KEY_PRESS, name='a')
+        elif m == 31:
+            data.append(t, macrofile.KEY_RELEASE, name='a')
+        else:
+            # x 坐标即事件序号，追赶模式跳过部分移动后仍能将调用对应回事件
+            data.append(t, macrofile.MOVE, i, 100 + i % 880)
+    return data
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _peak_rss_mb():
+    # 每个场景在单独的子进程中运行，进程的峰值 RSS 即该场景的峰值
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def _event_indexes(data, calls):
+    # 将后端调用对应回事件序号：移动可能被合并，其 x 坐标即序号；其余事件从不合并，按顺序对应
+    others = iter([i for i, type_code in enumerate(data.types) if type_code != macrofile.MOVE])
+    return [args[0] if method == 'move' else next(others) for _, method, args in calls]
+
+
+def run(player_cls, data, speed, timing_mode, catch_up, call_cost=0.0):
+    player = player_cls()
+    player.timer.mode = timing_mode
+    player.catch_up = catch_up
+    player.clock.set_speed(speed)
+
+    backend = CostlyNullBackend(call_cost)
+    compile_start = time.perf_counter()
+    plan = PlaybackPlan(data, backend)
+    compile_s = time.perf_counter() - compile_start
+    player._backend = backend
+    player.events = data
+    player.plan = plan
+    player.loops = 1
+    player.max_duration = 0.0
+    player.playing = True
+    player.stop_event.clear()
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    player._play_loop()
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    # 未变速、未暂停，虚拟时钟的截止时间在回放结束后仍然有效
+    origin = data.start_time
+    deadline = player.clock.deadline
+    times = data.times
+    lateness = [actual - deadline(times[i] - origin)
+                for (actual, _, _), i in zip(backend.calls, _event_indexes(data, backend.calls))]
+    drift = lateness[-1] - lateness[0]
+    lateness.sort()
+    return {
+        'events': len(data),
+        'played': len(backend.calls),
+        'coalesced': player.coalesced,
+        'speed': speed,
+        'compile_s': round(compile_s, 3),
+        'wall_s': round(wall, 3),
+        'events_per_s': round(len(data) / wall),
+        'cpu_percent': round(cpu / wall * 100, 1),
+        'lateness_us': {
+            'mean': round(sum(lateness) / len(lateness) * 1e6, 1),
+            'p50': round(_percentile(lateness, 0.5) * 1e6, 1),
+            'p90': round(_percentile(lateness, 0.9) * 1e6, 1),
+            'p99': round(_percentile(lateness, 0.99) * 1e6, 1),
+            'p999': round(_percentile(lateness, 0.999) * 1e6, 1),
+            'max': round(lateness[-1] * 1e6, 1),
+        },
+        'drift_ms': round(drift * 1e3, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _scenario(text):
+    events, rate, speed = text.split(':')
+    return int(events), float(rate), float(speed)
+
+
+def _run_child(args):
+    # 子进程：运行单个场景，将结果以 JSON 写到标准输出
+    settings.config['backend'] = 'null'
+    from player import MacroPlayer
+
+    events, rate, speed = args.child
+    # 回放线程会更新界面，重定向输出以免干扰 JSON 结果
+    stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        result = run(MacroPlayer, synthetic_macro(events, rate), speed, args.timing,
+                     not args.no_catch_up, args.call_cost * 1e-6)
+    finally:
+        sys.stdout = stdout
+    result['rate'] = rate
+    print(json.dumps(result))
+
+
+def _spawn(scenario, timing, call_cost, catch_up):
+    # 每个场景使用新的子进程，峰值内存互不累积
+    events, rate, speed = scenario
+    command = [sys.executable, os.path.abspath(__file__), '--child', f"{events}:{rate}:{speed}",
+               '--timing', timing, '--call-cost', str(call_cost)]
+    if not catch_up:
+        command.append('--no-catch-up')
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Playback timing accuracy and throughput against a non-injecting backend")
+    parser.add_argument('--scenario', action='append', type=_scenario, metavar='EVENTS:RATE:SPEED',
+                        help="events, macro density (events/s) and playback speed; repeatable")
+    parser.add_argument('--timing', choices=TIMING_MODES, default=settings.config.get('timing_mode', 'sleep'))
+    parser.add_argument('--saturation-events', type=int, default=100_000,
+                        help="macro size used to measure the maximum sustainable event rate")
+    parser.add_argument('--call-cost', type=float, default=0.0, metavar='US',
+                        help="simulated cost of one injected event in microseconds")
+    parser.add_argument('--no-catch-up', action='store_true', help="execute every stale move instead of coalescing")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    parser.add_argument('--child', type=_scenario, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args)
+        return
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timing_mode': args.timing,
+        'catch_up': not args.no_catch_up,
+        'call_cost_us': args.call_cost,
+        'scenarios': [_spawn(scenario, args.timing, args.call_cost, not args.no_catch_up)
+                      for scenario in sorted(args.scenario or SCENARIOS)],
+    }
+    saturation = _spawn((args.saturation_events, 10_000, SATURATION_SPEED), args.timing, 0.0, False)
+    results['max_event_rate'] = saturation['events_per_s']
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+
+
+def synthetic_macro(n, seed=1):
+    # 接近真实录制的宏：带抖动的 16 ms 采样移动，夹杂点击、滚轮与按键
+    rng = random.Random(seed)
+    data = macrofile.MacroData()
+    t, x, y = 0.0, 960, 540
+    while len(data) < n:
+        t += 0.016 + rng.uniform(-0.002, 0.004)
+        r = rng.random()
+        if r < 0.9:
+            x += rng.randint(-6, 6)
+            y += rng.randint(-6, 6)
+            data.append(t, macrofile.MOVE, x, y)
+        elif r < 0.93:
+            data.append(t, macrofile.CLICK, x, y, 'left', True)
+            t += 0.08
+            data.append(t, macrofile.CLICK, x, y, 'left', False)
+        elif r < 0.95:
+            data.append(t, macrofile.SCROLL, x, y, dy=-1)
+        else:
+            key = rng.choice('abcdefghij')
+            data.append(t, macrofile.KEY_PRESS, name=key)
+            t += 0.05
+            data.append(t, macrofile.KEY_RELEASE, name=key)
+    return data
+
+
+def _time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _load(path):
+    data = macrofile.load(path)
+    # 二进制格式按需映射，统一遍历一次计入解码成本
+    for _ in data:
+        pass
+    data.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File size and load time of the JSON, binary and compressed macro formats")
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data = synthetic_macro(args.events)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        formats = (
+            ('json', 'macro.json', macrofile.write_json),
+            ('binary', 'macro.bin', macrofile.write_binary),
+            ('zlib', 'macro.zlib.mcrz', lambda path, d: macrofile.write_compressed(path, d, 'zlib')),
+            ('lzma', 'macro.lzma.mcrz', lambda path, d: macrofile.write_compressed(path, d, 'lzma')),
+        )
+        for label, name, write in formats:
+            path = os.path.join(tmp, name)
+            save_seconds = _time(lambda: write(path, data), 1)
+            results[label] = {
+                'bytes': os.path.getsize(path),
+                'save_seconds': round(save_seconds, 3),
+                'load_seconds': round(_time(lambda: _load(path), args.repeat), 3),
+            }
+    json_bytes = results['json']['bytes']
+    for entry in results.values():
+        entry['reduction_vs_json'] = round(json_bytes / entry['bytes'], 1)
+    print(json.dumps({'events': len(data), 'formats': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 可在 settings.json 的 backend 中选择的输入后端
+BACKENDS = ('pynput', 'null', 'uinput')
+
+
+class InputBackend:
+    """回放输入后端接口。
+
+    resolve_key / resolve_button 将宏中记录的名称解析为后端自己的按键对象，
+    无法回放时返回 None；其余方法在回放线程上按计划调用。
+    """
+
+    name = ''
+
+    def resolve_key(self, name: Optional[str]) -> Any:
+        raise NotImplementedError
+
+    def resolve_button(self, name: Optional[str]) -> Any:
+        raise NotImplementedError
+
+    def move(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def press_button(self, button: Any) -> None:
+        raise NotImplementedError
+
+    def release_button(self, button: Any) -> None:
+        raise NotImplementedError
+
+    def scroll(self, dx: int, dy: int) -> None:
+        raise NotImplementedError
+
+    def press_key(self, key: Any) -> None:
+        raise NotImplementedError
+
+    def release_key(self, key: Any) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class PynputBackend(InputBackend):
+    name = 'pynput'
+
+    def __init__(self) -> None:
+        # 延迟导入，使 null 后端可以在没有图形环境的机器上运行
+        from pynput import mouse as pynput_mouse
+        from pynput import keyboard as pynput_keyboard
+        self._Key = pynput_keyboard.Key
+        self._Button = pynput_mouse.Button
+        self.mouse = pynput_mouse.Controller()
+        self.keyboard = pynput_keyboard.Controller()
+        self.press_button = self.mouse.press
+        self.release_button = self.mouse.release
+        self.scroll = self.mouse.scroll
+        self.press_key = self.keyboard.press
+        self.release_key = self.keyboard.release
+
+    def resolve_key(self, name: Optional[str]) -> Any:
+        # 特殊键解析为 Key 对象，单字符直接使用；其余名称无法回放
+        if not name:
+            return None
+        key = getattr(self._Key, name, None)
+        if key is not None:
+            return key
+        if len(name) == 1:
+            return name
+        return None
+
+    def resolve_button(self, name: Optional[str]) -> Any:
+        return getattr(self._Button, name or 'left', None)
+
+    def move(self, x: int, y: int) -> None:
+        self.mouse.position = (x, y)
+
+
+class NullBackend(InputBackend):
+    """不产生任何输入，只记录 (时间戳, 方法, 参数)，用于基准测试与无界面环境。"""
+
+    name = 'null'
+
+    def __init__(self, record: bool = True) -> None:
+        self.record = record
+        self.calls: List[Tuple[float, str, Tuple[Any, ...]]] = []
+
+    def _log(self, method: str, args: Tuple[Any, ...]) -> None:
+        if self.record:
+            self.calls.append((time.perf_counter(), method, args))
+
+    def resolve_key(self, name: Optional[str]) -> Any:
+        if not name:
+            return None
+        if name in _PYNPUT_KEYS or len(name) == 1:
+            return name
+        return None
+
+    def resolve_button(self, name: Optional[str]) -> Any:
+        name = name or 'left'
+        return name if name in _BUTTONS else None
+
+    def move(self, x: int, y: int) -> None:
+        self._log('move', (x, y))
+
+    def press_button(self, button: Any) -> None:
+        self._log('press_button', (button,))
+
+    def release_button(self, button: Any) -> None:
+        self._log('release_button', (button,))
+
+    def scroll(self, dx: int, dy: int) -> None:
+        self._log('scroll', (dx, dy))
+
+    def press_key(self, key: Any) -> None:
+        self._log('press_key', (key,))
+
+    def release_key(self, key: Any) -> None:
+        self._log('release_key', (key,))
+
+
+# Linux input-event-codes.h
+EV_SYN, EV_KEY, EV_REL, EV_ABS = 0x00, 0x01, 0x02, 0x03
+SYN_REPORT = 0
+REL_HWHEEL, REL_WHEEL = 0x06, 0x08
+ABS_X, ABS_Y = 0x00, 0x01
+
+# uinput.h 中的 ioctl 编号
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_RELBIT = 0x40045566
+UI_SET_ABSBIT = 0x40045567
+
+# struct input_event: timeval + type + code + value (内核会填写时间)
+_EVENT = struct.Struct('@llHHi')
+# struct uinput_user_dev: name[80] + input_id + ff_effects_max + absmax/absmin/absfuzz/absflat[64]
+_ABS_CNT = 64
+_USER_DEV = struct.Struct('80sHHHHI%di' % (_ABS_CNT * 4))
+BUS_USB = 0x03
+
+_BUTTONS = {'left': 0x110, 'right': 0x111, 'middle': 0x112, 'x1': 0x113, 'x2': 0x114}
+
+# pynput 特殊键名称 -> evdev 键码
+_PYNPUT_KEYS = {
+    'esc': 1, 'backspace': 14, 'tab': 15, 'enter': 28, 'space': 57,
+    'ctrl': 29, 'ctrl_l': 29, 'ctrl_r': 97,
+    'shift': 42, 'shift_l': 42, 'shift_r': 54,
+    'alt': 56, 'alt_l': 56, 'alt_r': 100, 'alt_gr': 100,
+    'cmd': 125, 'cmd_l': 125, 'cmd_r': 126, 'menu': 127,
+    'caps_lock': 58, 'num_lock': 69, 'scroll_lock': 70,
+    'print_screen': 99, 'pause': 119, 'insert': 110, 'delete': 111,
+    'home': 102, 'end': 107, 'page_up': 104, 'page_down': 109,
+    'up': 103, 'down': 108, 'left': 105, 'right': 106,
+    'media_play_pause': 164, 'media_next': 163, 'media_previous': 165,
+    'media_volume_mute': 113, 'media_volume_down': 114, 'media_volume_up': 115,
+}
+_PYNPUT_KEYS.update({'f%d' % i: 58 + i for i in range(1, 11)})
+_PYNPUT_KEYS.update({'f11': 87, 'f12': 88})
+_PYNPUT_KEYS.update({'f%d' % i: 170 + i for i in range(13, 21)})
+
+# 美式键盘布局下字符对应的物理键；Shift 由宏中单独记录的 shift 事件提供
+_CHAR_KEYS: Dict[str, int] = {}
+for _row, _first in (('1234567890-=', 2), ('qwertyuiop[]', 16), ("asdfghjkl;'`", 30), ('\\zxcvbnm,./', 43)):
+    for _i, _ch in enumerate(_row):
+        _CHAR_KEYS[_ch] = _first + _i
+for _shifted, _base in zip('!@#$%^&*()_+{}:"~|<>?', "1234567890-=[];'`\\,./"):
+    _CHAR_KEYS[_shifted] = _CHAR_KEYS[_base]
+_CHAR_KEYS[' '] = 57
+_CHAR_KEYS['\t'] = 15
+_CHAR_KEYS['\n'] = 28
+
+
+class UinputBackend(InputBackend):
+    """通过 /dev/uinput 注入事件的 Linux 后端，绕过 X11/Wayland 客户端库。
+
+    每个动作的全部输入事件与结尾的 SYN_REPORT 拼成一次 write()，
+    例如一次移动只产生一次系统调用，且 X/Y 坐标被合成器原子地应用。
+    """
+
+    name = 'uinput'
+
+    def __init__(self, screen_size: Tuple[int, int] = (1920, 1080), path: str = '/dev/uinput') -> None:
+        import fcntl
+        self._fcntl = fcntl
+        self._syn = _EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+        self.fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            self._setup(fcntl, screen_size)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _setup(self, fcntl: Any, screen_size: Tuple[int, int]) -> None:
+        fd = self.fd
+        for ev in (EV_KEY, EV_REL, EV_ABS):
+            fcntl.ioctl(fd, UI_SET_EVBIT, ev)
+        for code in set(_PYNPUT_KEYS.values()) | set(_CHAR_KEYS.values()) | set(_BUTTONS.values()):
+            fcntl.ioctl(fd, UI_SET_KEYBIT, code)
+        for code in (REL_WHEEL, REL_HWHEEL):
+            fcntl.ioctl(fd, UI_SET_RELBIT, code)
+        for code in (ABS_X, ABS_Y):
+            fcntl.ioctl(fd, UI_SET_ABSBIT, code)
+        # 绝对坐标范围与屏幕分辨率一致，宏中的像素坐标可直接使用
+        absmax = [0] * _ABS_CNT
+        absmax[ABS_X] = max(1, screen_size[0] - 1)
+        absmax[ABS_Y] = max(1, screen_size[1] - 1)
+        zeros = [0] * _ABS_CNT
+        os.write(fd, _USER_DEV.pack(b'macro-uinput', BUS_USB, 0x1, 0x1, 1, 0,
+                                    *(absmax + zeros + zeros + zeros)))
+        fcntl.ioctl(fd, UI_DEV_CREATE)
+        # 等待桌面环境识别新设备，否则最初的事件可能丢失
+        time.sleep(0.2)
+
+    def _send(self, *events: Tuple[int, int, int]) -> None:
+        os.write(self.fd, b''.join([_EVENT.pack(0, 0, t, c, v) for t, c, v in events]) + self._syn)
+
+    def resolve_key(self, name: Optional[str]) -> Any:
+        if not name:
+            return None
+        code = _PYNPUT_KEYS.get(name)
+        if code is None and len(name) == 1:
+            ch = name
+            # 按住 Ctrl 时部分平台记录为控制字符
+            if '\x01' <= ch <= '\x1a':
+                ch = chr(ord(ch) + 96)
+            code = _CHAR_KEYS.get(ch.lower())
+        return code
+
+    def resolve_button(self, name: Optional[str]) -> Any:
+        return _BUTTONS.get(name or 'left')
+
+    def move(self, x: int, y: int) -> None:
+        self._send((EV_ABS, ABS_X, x), (EV_ABS, ABS_Y, y))
+
+    def press_button(self, button: int) -> None:
+        self._send((EV_KEY, button, 1))
+
+    def release_button(self, button: int) -> None:
+        self._send((EV_KEY, button, 0))
+
+    def scroll(self, dx: int, dy: int) -> None:
+        events = []
+        if dy:
+            events.append((EV_REL, REL_WHEEL, dy))
+        if dx:
+            events.append((EV_REL, REL_HWHEEL, dx))
+        if events:
+            self._send(*events)
+
+    def press_key(self, key: int) -> None:
+        self._send((EV_KEY, key, 1))
+
+    def release_key(self, key: int) -> None:
+        self._send((EV_KEY, key, 0))
+
+    def close(self) -> None:
+        if self.fd is None:
+            return
+        try:
+            self._fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+        except OSError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+
+def create_backend(name: str, config: Optional[dict] = None) -> InputBackend:
+    config = config or {}
+    if name == 'null':
+        return NullBackend()
+    if name == 'uinput':
+        return UinputBackend(tuple(config.get('uinput_screen_size', (1920, 1080))))
+    return PynputBackend()
+
+
+def backend_from_settings(config: dict) -> InputBackend:
+    name = config.get('backend', 'pynput')
+    return create_backend(name if name in BACKENDS else 'pynput', config)
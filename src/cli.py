@@ -0,0 +1,276 @@
+import argparse
+import json
+import sys
+import time
+from typing import Any, List, Optional, TextIO
+
+from settings import settings
+from display import display
+from backends import BACKENDS
+
+COMMANDS = ('play', 'record', 'convert', 'optimize')
+
+# 退出码
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_INTERRUPTED = 130
+
+
+class ProgressWriter:
+    """以 JSON Lines 输出机器可读的进度，每行一个事件并带有自启动以来的秒数。"""
+
+    def __init__(self, stream: Optional[TextIO]) -> None:
+        self.stream = stream
+        self.origin = time.perf_counter()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.stream is None:
+            return
+        record = {'event': event, 'elapsed': round(time.perf_counter() - self.origin, 3)}
+        record.update(fields)
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+def _number(convert, minimum, inclusive):
+    # argparse 的 type：数值越界时报告用法错误 (退出码 2)
+    def parse(text: str):
+        try:
+            value = convert(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid number: {text!r}")
+        if value < minimum or (not inclusive and value == minimum) or value != value:
+            raise argparse.ArgumentTypeError(f"must be {'>=' if inclusive else '>'} {minimum}: {text!r}")
+        return value
+    return parse
+
+
+positive_float = _number(float, 0.0, False)
+non_negative_float = _number(float, 0.0, True)
+non_negative_int = _number(int, 0, True)
+
+
+def _open_progress(args) -> Optional[TextIO]:
+    # 未指定 --progress 时，无界面模式输出到 stdout，界面模式不输出
+    if args.progress == '-' or (args.progress is None and args.no_tui):
+        return sys.stdout
+    if args.progress:
+        return open(args.progress, 'w', encoding='utf-8')
+    return None
+
+
+def _start_tui() -> None:
+    sys.stdout.write("\033[2J\033[H\033[?25l")
+    display.set_hotkeys(settings.config['hotkeys'])
+    display.render()
+    display.start()
+
+
+def _stop_tui() -> None:
+    display.stop()
+    sys.stdout.write("\033[?25h\n")
+    sys.stdout.flush()
+
+
+def _invalid_keys(player) -> dict:
+    # 回放中跳过的按键与按钮名称 (流式模式下在回放过程中才被发现)，没有时不输出该字段
+    return {'invalid_keys': list(player.plan.invalid)} if player.plan.invalid else {}
+
+
+def cmd_play(args, progress: ProgressWriter) -> int:
+    from player import MacroPlayer
+
+    if args.backend:
+        settings.config['backend'] = args.backend
+    # 指定任一遥测文件时启用遥测，未指定的另一种格式不写出
+    if args.telemetry_json or args.telemetry_prom:
+        settings.config['telemetry'].update(enabled=True, json_file=args.telemetry_json,
+                                            prometheus_file=args.telemetry_prom)
+    player = MacroPlayer()
+    if args.speed is not None:
+        player.speed = args.speed
+    if args.loops is None:
+        # 无界面回放默认只播放一次，时间线文件可自行指定循环次数
+        settings.config['loop_count'] = 1
+    if not player.start(args.file, loops=args.loops, gap=args.gap, max_duration=args.max_duration,
+                        position=args.start, event=args.start_event):
+        progress.emit('error', message=display.status)
+        return EXIT_ERROR
+    try:
+        count = len(player.events)
+    except TypeError:
+        # JSON 流式读取时事件数未知
+        count = None
+    _, _, span = player.progress()
+    progress.emit('start', file=args.file, events=count, duration=round(span, 3),
+                  loops=player.loops, gap=player.loop_gap, max_duration=player.max_duration,
+                  speed=player.speed)
+    try:
+        while player.play_thread.is_alive():
+            player.play_thread.join(args.interval)
+            loop, position, span = player.progress()
+            if player.play_thread.is_alive():
+                progress.emit('progress', loop=loop, position=round(position, 3), duration=round(span, 3))
+    except KeyboardInterrupt:
+        player.stop()
+        # position 可作为 --start 的参数从中断处继续
+        _, position, _ = player.progress()
+        progress.emit('done', status='interrupted', loops=player.loops_done, position=round(position, 6),
+                      coalesced=player.coalesced, **_invalid_keys(player))
+        return EXIT_INTERRUPTED
+    finally:
+        player.close()
+    if player.error:
+        _, position, _ = player.progress()
+        progress.emit('done', status='error', message=player.error, loops=player.loops_done,
+                      position=round(position, 6), **_invalid_keys(player))
+        return EXIT_ERROR
+    fields = _invalid_keys(player)
+    if player.telemetry is not None:
+        summary = player.telemetry.as_dict()
+        fields.update((key, summary[key]) for key in ('events', 'events_per_second', 'late', 'errors'))
+    progress.emit('done', status='completed', loops=player.loops_done, coalesced=player.coalesced, **fields)
+    return EXIT_OK
+
+
+def cmd_record(args, progress: ProgressWriter) -> int:
+    from recorder import MacroRecorder
+
+    settings.config['macro_filename'] = args.file
+    recorder = MacroRecorder()
+    recorder.start()
+    progress.emit('start', file=args.file, duration=args.duration)
+    status = 'completed'
+    try:
+        deadline = time.perf_counter() + args.duration if args.duration else None
+        while deadline is None or time.perf_counter() < deadline:
+            wait = args.interval if deadline is None else min(args.interval, deadline - time.perf_counter())
+            time.sleep(max(0.0, wait))
+            progress.emit('progress', events=recorder.recorded_count())
+    except KeyboardInterrupt:
+        # Ctrl+C 正常结束录制并保存
+        status = 'interrupted'
+    recorder.stop()
+    # 钩子回调的调用次数、延迟与环形缓冲区溢出丢弃的事件数
+    hooks = recorder.hook_stats()
+    if not recorder.saved:
+        progress.emit('done', status='error', message=display.status, events=recorder.last_count, hooks=hooks)
+        return EXIT_ERROR
+    progress.emit('done', status=status, events=recorder.last_count, file=args.file, hooks=hooks)
+    return EXIT_OK
+
+
+def cmd_convert(args, progress: ProgressWriter) -> int:
+    import macrofile
+
+    try:
+        count = macrofile.convert(args.src, args.dst)
+    except (OSError, macrofile.MacroFormatError) as e:
+        progress.emit('error', message=str(e))
+        return EXIT_ERROR
+    progress.emit('done', status='completed', events=count, src=args.src, dst=args.dst)
+    return EXIT_OK
+
+
+def cmd_optimize(args, progress: ProgressWriter) -> int:
+    import macrofile
+    from optimize import DEFAULT_PASSES, optimize, optimizer_from_settings
+
+    # 未指定 --passes 时使用 optimizer.passes，其为空时运行默认的各遍 (以及 simplify_tolerance 启用的路径简化)
+    passes, options = optimizer_from_settings(settings.config)
+    if args.passes:
+        passes = args.passes.split(',')
+    elif not settings.config.get('optimizer', {}).get('passes'):
+        passes += DEFAULT_PASSES
+    if args.max_idle is not None:
+        options['max_idle'] = args.max_idle
+    if args.scroll_window is not None:
+        options['scroll_window'] = args.scroll_window
+    try:
+        source = macrofile.load(args.src)
+        data, reports = optimize(source, passes, options)
+        macrofile.save(args.dst, data)
+    except KeyError as e:
+        progress.emit('error', message=f"unknown pass {e}")
+        return EXIT_ERROR
+    except (OSError, macrofile.MacroFormatError) as e:
+        progress.emit('error', message=str(e))
+        return EXIT_ERROR
+    for report in reports:
+        progress.emit('pass', **report.as_dict())
+    progress.emit('done', status='completed', events_before=len(source), events=len(data),
+                  saved=round(sum(report.saved for report in reports), 3), src=args.src, dst=args.dst)
+    source.close()
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='macro', description="Headless macro playback, recording and conversion")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_output_options(p: argparse.ArgumentParser) -> None:
+        p.add_argument('--no-tui', action='store_true', help="disable the full-screen display")
+        p.add_argument('--progress', metavar='FILE',
+                       help="write JSON Lines progress to FILE ('-' for stdout; default stdout with --no-tui)")
+        p.add_argument('--interval', type=positive_float, default=1.0, help="seconds between progress lines")
+
+    play = sub.add_parser('play', help="play a macro file")
+    play.add_argument('file')
+    play.add_argument('--speed', type=positive_float, help="playback speed (default: default_speed)")
+    play.add_argument('--loops', type=non_negative_int, help="number of loops, 0 = until interrupted (default 1)")
+    play.add_argument('--gap', type=non_negative_float, help="seconds between loops, 0 = back to back (default: loop_gap)")
+    play.add_argument('--max-duration', type=non_negative_float,
+                      help="stop after this many seconds of macro time, 0 = no limit (default: max_duration)")
+    play.add_argument('--backend', choices=BACKENDS, help="override the input backend")
+    play.add_argument('--telemetry-json', metavar='FILE', help="write run telemetry as JSON to FILE")
+    play.add_argument('--telemetry-prom', metavar='FILE', help="write run telemetry in Prometheus text format to FILE")
+    start = play.add_mutually_exclusive_group()
+    start.add_argument('--start', type=non_negative_float, metavar='SECONDS',
+                       help="start the first loop at this time, e.g. the position of an interrupted run")
+    start.add_argument('--start-event', type=non_negative_int, metavar='N', help="start the first loop at event N (0-based)")
+    add_output_options(play)
+
+    record = sub.add_parser('record', help="record a macro file")
+    record.add_argument('file')
+    record.add_argument('--duration', type=positive_float, help="stop after this many seconds (default: until Ctrl+C)")
+    add_output_options(record)
+
+    convert = sub.add_parser('convert', help="convert between JSON and binary macro formats")
+    convert.add_argument('src')
+    convert.add_argument('dst')
+    convert.add_argument('--progress', metavar='FILE', default='-', help="write the JSON result to FILE")
+    convert.set_defaults(no_tui=True, interval=1.0)
+
+    optimize = sub.add_parser('optimize', help="run optimizer passes over a macro file")
+    optimize.add_argument('src')
+    optimize.add_argument('dst')
+    optimize.add_argument('--passes', help="comma-separated passes: noop_moves, autorepeat, scroll, idle, simplify "
+                                           "(default: optimizer.passes, or all but simplify)")
+    optimize.add_argument('--max-idle', type=non_negative_float, help="cap idle gaps at this many seconds (idle pass)")
+    optimize.add_argument('--scroll-window', type=non_negative_float, help="merge scrolls within this many seconds (scroll pass)")
+    optimize.add_argument('--progress', metavar='FILE', default='-', help="write the JSON report to FILE")
+    optimize.set_defaults(no_tui=True, interval=1.0)
+    return parser
+
+
+def main(argv: List[str]) -> int:
+    args = build_parser().parse_args(argv)
+    handler = {'play': cmd_play, 'record': cmd_record, 'convert': cmd_convert,
+               'optimize': cmd_optimize}[args.command]
+    stream = _open_progress(args)
+    tui = not args.no_tui
+    if tui:
+        _start_tui()
+    else:
+        display.disable()
+    try:
+        return handler(args, ProgressWriter(stream))
+    finally:
+        if tui:
+            _stop_tui()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,5 +1,6 @@
 import sys
 import threading
+import time
 import re
 import unicodedata
 
@@ -12,6 +13,19 @@ except ImportError:
     from settings import settings
     from i18n import t
 
+# 匹配 ANSI 转义码
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# 边框字符
+TL, TR, BL, BR = '╭', '╮', '╰', '╯'
+H, V = '─', '│'
+M_L, M_R = '├', '┤'
+
+# 动态行在画面中的行号 (从 0 开始)
+STATUS_ROW = 3
+PROGRESS_ROW = 5
+
+
 class DisplayManager:
     def __init__(self):
         self.status = t('status.ready')
@@ -19,6 +33,24 @@ class DisplayManager:
         self.progress = (0, 0)
         self.lock = threading.Lock()
         self.hotkeys = {}
+        # 静态画面 (边框、标题、快捷键) 仅在语言、主题或热键变化时重建
+        self._frame_key = None
+        self._frame = None
+        self._width_cache = {}
+        # 上一次输出到终端的各行，用于只重绘发生变化的行
+        self._last_lines = None
+        self.bytes_written = 0
+        # 即使没有变化也定期整屏重绘，修复其他输出 (例如 stderr 上的错误信息) 弄乱的画面
+        self.full_redraw_interval = 2.0
+        self._last_full_redraw = 0.0
+        # 渲染线程：状态更新只标记为脏并立即返回，由该线程按固定帧率合并重绘
+        self._render_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._running = False
+        self._thread = None
+        self.frame_interval = 0.05
+        # 无界面模式下只保存状态，不做任何渲染
+        self.enabled = True
 
     def _c(self, name):
         # 从主题设置获取颜色代码
@@ -26,17 +58,24 @@ class DisplayManager:
         return Colors.get(color_name)
 
     def _visible_len(self, s):
-        # 计算去除 ANSI 转义码后的字符串视觉长度（支持中文字符）
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        text = ansi_escape.sub('', s)
+        # 计算去除 ANSI 转义码后的字符串视觉长度（支持中文字符），结果按字符串缓存
+        length = self._width_cache.get(s)
+        if length is not None:
+            return length
+        text = ANSI_ESCAPE.sub('', s)
         length = 0
         for char in text:
             # 'W'（全角）和 'F'（全宽）长度为 2
             # 'A'（不确定宽度）通常在终端中显示为 1，除非特殊配置
-            if unicodedata.east_asian_width(char) in ('F', 'W'):
+            if char.isascii():
+                length += 1
+            elif unicodedata.east_asian_width(char) in ('F', 'W'):
                 length += 2
             else:
                 length += 1
+        if len(self._width_cache) > 4096:
+            self._width_cache.clear()
+        self._width_cache[s] = length
         return length
 
     def _pad_text(self, text, width, align='left'):
@@ -62,153 +101,289 @@ class DisplayManager:
     def update_status(self, status):
         with self.lock:
             self.status = status
-        self.render()
+        self._post()
+
+    def update_status_if(self, expected, status):
+        # 仅在状态仍为 expected 时更新，供后台任务避免覆盖之后的状态
+        with self.lock:
+            if self.status != expected:
+                return
+            self.status = status
+        self._post()
 
     def update_speed(self, speed):
         with self.lock:
             self.speed = speed
-        self.render()
+        self._post()
 
     def update_progress(self, current, total):
         with self.lock:
             self.progress = (current, total)
+        self._post()
+
+    def disable(self):
+        self.enabled = False
+
+    def _post(self):
+        # 渲染线程未启动时 (例如脚本直接使用) 保持同步渲染
+        if not self.enabled:
+            return
+        if self._thread is not None:
+            self._dirty.set()
+        else:
+            self.render()
+
+    def start(self, fps=None):
+        if self._thread is not None or not self.enabled:
+            return
+        if fps is None:
+            fps = settings.config.get('display_fps', 20)
+        self.frame_interval = 1.0 / max(1, fps)
+        self._running = True
+        self._thread = threading.Thread(target=self._render_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # 停止渲染线程并同步输出最后一帧
+        if self._thread is None:
+            return
+        self._running = False
+        self._dirty.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
         self.render()
 
-    def render(self):
+    def _render_loop(self):
+        next_frame = 0.0
+        while self._running:
+            # 空闲时也按 full_redraw_interval 醒来一次，让定期整屏重绘生效
+            self._dirty.wait(self.full_redraw_interval)
+            if not self._running:
+                break
+            # 在一个帧间隔内到达的更新合并为一次重绘
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._dirty.clear()
+            self.render()
+            # 下一帧从本次输出完成后开始计时，终端较慢时自动丢弃中间帧
+            next_frame = time.perf_counter() + self.frame_interval
+
+    def invalidate(self):
+        # 整屏重绘 (例如其他输出弄乱了画面)
+        with self.lock:
+            self._last_lines = None
+        self._post()
+
+    def _build_frame(self):
+        # 构建静态画面：除状态行与进度行以外的所有行，以及渲染动态行所需的文本和颜色
         key_width = 14
         desc_candidates = [
             t('hotkey.record'),
             t('hotkey.play'),
             t('hotkey.speed_up'),
-            t('hotkey.speed_down')
+            t('hotkey.speed_down'),
+            t('hotkey.pause')
         ]
         desc_width = max(10, max(self._visible_len(d) for d in desc_candidates))
         pair_len = key_width + 1 + desc_width
         # 计算整体宽度，确保两组快捷键在一行内对齐
         width = max(54, 2 * pair_len + 4)
-        # 边框字符
-        TL, TR, BL, BR = '╭', '╮', '╰', '╯'
-        H, V = '─', '│'
-        M_L, M_R = '├', '┤'
-        
+
         border_color = self._c('border')
         title_color = self._c('title')
         label_color = self._c('label')
-        
+        left = f"{border_color}{V}{Colors.ENDC}"
+        right = f"{border_color}{V}{Colors.ENDC}"
+
         lines = []
-        
+
         # 1. 顶部边框
         lines.append(f"{border_color}{TL}{H * (width - 2)}{TR}{Colors.ENDC}")
-        
+
         # 2. 标题
         title = t('title')
         styled_title = f"{title_color}{Colors.BOLD}{title}{Colors.ENDC}"
-        lines.append(f"{border_color}{V}{Colors.ENDC}{self._center_text(styled_title, width - 2)}{border_color}{V}{Colors.ENDC}")
-        
+        lines.append(f"{left}{self._center_text(styled_title, width - 2)}{right}")
+
         # 3. 分隔线
         lines.append(f"{border_color}{M_L}{H * (width - 2)}{M_R}{Colors.ENDC}")
-        
+
+        # 4. 状态与速度 (动态)
+        lines.append(None)
+
+        # 5. 空行
+        lines.append(f"{border_color}{V}{' ' * (width - 2)}{V}{Colors.ENDC}")
+
+        # 6. 进度条 (动态)
+        lines.append(None)
+
+        # 7. 分隔线
+        lines.append(f"{border_color}{M_L}{H * (width - 2)}{M_R}{Colors.ENDC}")
+
+        # 8. 快捷键
+        if self.hotkeys:
+            hk = self.hotkeys
+            # 格式化按键与说明
+            def fmt_pair(k, d):
+                key_str = f"[{k.upper()}]"
+                # 按键固定宽度，说明宽度按当前语言最长文本自适应
+                return f"{self._pad_text(key_str, key_width)} {self._pad_text(d, desc_width)}"
+
+            # 第一行
+            pair1 = fmt_pair(hk.get('record', ''), t('hotkey.record'))
+            pair2 = fmt_pair(hk.get('play', ''), t('hotkey.play'))
+
+            # 总宽 54 -> 内部宽度 52
+            # " " + pair1 (25) + " " + pair2 (25) + " " = 52，空格数量正好为 1
+
+            row1 = f" {pair1} {pair2}"
+            row1 = self._pad_text(row1, width - 2)
+            lines.append(f"{left}{row1}{right}")
+
+            # 第二行
+            pair3 = fmt_pair(hk.get('speed_up', ''), t('hotkey.speed_up'))
+            pair4 = fmt_pair(hk.get('speed_down', ''), t('hotkey.speed_down'))
+
+            row2 = f" {pair3} {pair4}"
+            row2 = self._pad_text(row2, width - 2)
+            lines.append(f"{left}{row2}{right}")
+
+            # 第三行
+            pair5 = fmt_pair(hk.get('pause', ''), t('hotkey.pause'))
+            row3 = self._pad_text(f" {pair5}", width - 2)
+            lines.append(f"{left}{row3}{right}")
+        else:
+            lines.append(f"{left}{self._center_text(t('loading.hotkeys'), width - 2)}{right}")
+
+        # 9. 底部边框
+        lines.append(f"{border_color}{BL}{H * (width - 2)}{BR}{Colors.ENDC}")
+
+        progress_label = f"{label_color}{t('label.progress')}:{Colors.ENDC}"
+        return {
+            'lines': lines,
+            'width': width,
+            'left': left,
+            'right': right,
+            'status_label': f"{label_color}{t('label.status')}:{Colors.ENDC}",
+            'speed_label': f"{label_color}{t('label.speed')}:{Colors.ENDC}",
+            'progress_label': progress_label,
+            'progress_label_len': self._visible_len(progress_label),
+            'recording_states': {t('status.recording'), t('status.saving')},
+            'playing_states': {t('status.playing'), t('status.stopping')},
+            'paused_state': t('status.paused'),
+            'status_recording': self._c('status_recording'),
+            'status_playing': self._c('status_playing'),
+            'progress_bar': self._c('progress_bar'),
+        }
+
+    def _get_frame(self):
+        key = (
+            settings.config.get('language'),
+            tuple(sorted(settings.config.get('theme', {}).items())),
+            tuple(sorted(self.hotkeys.items())) if self.hotkeys else None,
+        )
+        if key != self._frame_key:
+            self._frame = self._build_frame()
+            self._frame_key = key
+            self._last_lines = None
+        return self._frame
+
+    def _status_line(self, frame):
         # 4. 状态与速度
         status_value = self.status
-        recording_states = {t('status.recording'), t('status.saving')}
-        playing_states = {t('status.playing'), t('status.stopping')}
-        if status_value in recording_states:
-            status_color = self._c('status_recording')
+        if status_value in frame['recording_states']:
+            status_color = frame['status_recording']
             symbol = "●"
-        elif status_value in playing_states:
-            status_color = self._c('status_playing')
+        elif status_value in frame['playing_states']:
+            status_color = frame['status_playing']
             symbol = "▶"
+        elif status_value == frame['paused_state']:
+            status_color = frame['status_playing']
+            symbol = "‖"
         else:
             status_color = Colors.BRIGHT_WHITE
             symbol = "■"
-            
-        status_text = f"{label_color}{t('label.status')}:{Colors.ENDC} {status_color}{symbol} {self.status}{Colors.ENDC}"
-        speed_text = f"{label_color}{t('label.speed')}:{Colors.ENDC} {self.speed:>3.1f}x"
-        
+
+        status_text = f"{frame['status_label']} {status_color}{symbol} {self.status}{Colors.ENDC}"
+        speed_text = f"{frame['speed_label']} {self.speed:>3.1f}x"
+
         # 状态与速度同一行展示
         # 布局示例: │ 状态: ● 录制中       速度: 1.0x │
-        content_width = width - 4 # 左右各 1 个空格加上两侧边框
-        
+        content_width = frame['width'] - 4 # 左右各 1 个空格加上两侧边框
+
         # 简单布局：状态左对齐，速度右对齐
         # 需要手动计算填充长度
         s_len = self._visible_len(status_text)
         sp_len = self._visible_len(speed_text)
         gap = content_width - s_len - sp_len
-        
+
         if gap > 0:
             line_content = f" {status_text}{' ' * gap}{speed_text} "
         else:
             line_content = f" {status_text} {speed_text} " # 间距不足时的回退方案
-            
-        lines.append(f"{border_color}{V}{Colors.ENDC}{line_content}{border_color}{V}{Colors.ENDC}")
-        
-        # 5. 空行
-        lines.append(f"{border_color}{V}{' ' * (width - 2)}{V}{Colors.ENDC}")
 
+        return f"{frame['left']}{line_content}{frame['right']}"
+
+    def _progress_line(self, frame):
         # 6. 进度条
+        width = frame['width']
         curr, total = self.progress
         if total > 0:
             percent = min(1.0, max(0.0, curr / total))
             # 根据标签与百分比长度动态计算进度条长度，避免溢出
-            label_part = f"{label_color}{t('label.progress')}:{Colors.ENDC}"
             percent_part = f"{int(percent*100):>3}%"
             inner_width = width - 2
-            reserved = 1 + self._visible_len(label_part) + 1 + self._visible_len(percent_part) + 1
+            reserved = 1 + frame['progress_label_len'] + 1 + len(percent_part) + 1
             bar_len = max(0, inner_width - reserved)
             filled = int(bar_len * percent)
-            # 空槽使用更简洁的轨迹符号
-            bar = '█' * filled + '━' * (bar_len - filled)
-            bar_color = self._c('progress_bar')
-            # 空槽使用亮黑色
+            # 空槽使用亮黑色及更简洁的轨迹符号
             empty_color = Colors.BRIGHT_BLACK
-            
+
             # 构造带颜色的进度条
-            colored_bar = f"{bar_color}{'█' * filled}{Colors.ENDC}{empty_color}{'━' * (bar_len - filled)}{Colors.ENDC}"
-            prog_text = f"{label_part} {colored_bar} {percent_part}"
+            colored_bar = f"{frame['progress_bar']}{'█' * filled}{Colors.ENDC}{empty_color}{'━' * (bar_len - filled)}{Colors.ENDC}"
+            prog_text = f"{frame['progress_label']} {colored_bar} {percent_part}"
+            # 进度条各部分宽度已知，直接计算填充
+            padding = max(0, inner_width - reserved - bar_len)
+            content = f" {prog_text}{' ' * padding}"
         else:
-            prog_text = f"{label_color}{t('label.progress')}:{Colors.ENDC} --"
-            
-        lines.append(f"{border_color}{V}{Colors.ENDC}{self._pad_text(' ' + prog_text, width - 2)}{border_color}{V}{Colors.ENDC}")
-
-        # 7. 分隔线
-        lines.append(f"{border_color}{M_L}{H * (width - 2)}{M_R}{Colors.ENDC}")
+            prog_text = f"{frame['progress_label']} --"
+            content = self._pad_text(' ' + prog_text, width - 2)
 
-        # 8. 快捷键
-        if self.hotkeys:
-            hk = self.hotkeys
-            # 格式化按键与说明
-            def fmt_pair(k, d):
-                key_str = f"[{k.upper()}]"
-                # 按键固定宽度，说明宽度按当前语言最长文本自适应
-                return f"{self._pad_text(key_str, key_width)} {self._pad_text(d, desc_width)}"
+        return f"{frame['left']}{content}{frame['right']}"
 
-            # 第一行
-            pair1 = fmt_pair(hk.get('record', ''), t('hotkey.record'))
-            pair2 = fmt_pair(hk.get('play', ''), t('hotkey.play'))
-            
-            # 总宽 54 -> 内部宽度 52
-            # " " + pair1 (25) + " " + pair2 (25) + " " = 52，空格数量正好为 1
-            
-            row1 = f" {pair1} {pair2}" 
-            row1 = self._pad_text(row1, width - 2)
-            lines.append(f"{border_color}{V}{Colors.ENDC}{row1}{border_color}{V}{Colors.ENDC}")
-            
-            # 第二行
-            pair3 = fmt_pair(hk.get('speed_up', ''), t('hotkey.speed_up'))
-            pair4 = fmt_pair(hk.get('speed_down', ''), t('hotkey.speed_down'))
-            
-            row2 = f" {pair3} {pair4}"
-            row2 = self._pad_text(row2, width - 2)
-            lines.append(f"{border_color}{V}{Colors.ENDC}{row2}{border_color}{V}{Colors.ENDC}")
-        else:
-            lines.append(f"{border_color}{V}{Colors.ENDC}{self._center_text(t('loading.hotkeys'), width - 2)}{border_color}{V}{Colors.ENDC}")
+    def render(self):
+        if not self.enabled:
+            return
+        with self._render_lock:
+            output = self._compose()
+            if not output:
+                return
+            self.bytes_written += len(output.encode('utf-8'))
+            sys.stdout.write(output)
+            sys.stdout.flush()
 
-        # 9. 底部边框
-        lines.append(f"{border_color}{BL}{H * (width - 2)}{BR}{Colors.ENDC}")
+    def _compose(self):
+        # 在状态锁内生成输出，写终端时不再持有状态锁，避免阻塞状态更新
+        with self.lock:
+            frame = self._get_frame()
+            lines = list(frame['lines'])
+            lines[STATUS_ROW] = self._status_line(frame)
+            lines[PROGRESS_ROW] = self._progress_line(frame)
 
-        # 输出渲染结果，移动到左上角后逐行覆盖，并清理行尾
-        output = "\033[H" + "\n".join([line + "\033[K" for line in lines]) + "\033[J"
-        sys.stdout.write(output)
-        sys.stdout.flush()
+            last = self._last_lines
+            now = time.perf_counter()
+            if last is None or len(last) != len(lines) or now - self._last_full_redraw >= self.full_redraw_interval:
+                # 整屏重绘：移动到左上角后逐行覆盖，并清理行尾
+                self._last_full_redraw = now
+                output = "\033[H" + "\n".join([line + "\033[K" for line in lines]) + "\033[J"
+            else:
+                # 只重绘发生变化的行
+                output = "".join(
+                    f"\033[{row + 1};1H{line}\033[K"
+                    for row, line in enumerate(lines) if line != last[row]
+                )
+            self._last_lines = lines
+            return output
 
 display = DisplayManager()
@@ -33,6 +33,19 @@ DEFAULT_TRANSLATIONS = {
         "hotkey.speed_up": "加速",
         "hotkey.speed_down": "减速",
         "hotkey.toggle_language": "切换语言",
+        "status.recovered": "已恢复未完成的录制: {count} 个事件 -> {filename}",
+        "status.recover_failed": "无法恢复未完成的录制: 日志已损坏，已移至 {path}",
+        "error.invalid_keys": "已跳过无法回放的按键名称: {keys}",
+        "status.paused": "已暂停",
+        "hotkey.pause": "暂停/继续",
+        "status.simplified": "已简化鼠标轨迹: 从 {total} 个事件中移除 {removed} 个",
+        "error.hook_overrun": "输入缓冲区溢出: 已丢弃 {count} 个事件",
+        "error.backend_unavailable": "输入后端 {backend} 不可用 ({error})，改用 pynput",
+        "status.coalesced": "就绪 (追赶模式合并了 {count} 个鼠标移动)",
+        "error.slot_empty": "宏库槽位 {slot} 为空",
+        "status.optimized": "已优化: 移除 {removed} 个事件，缩短 {saved} 秒",
+        "error.seek_unsupported": "多轨时间线不支持从指定位置开始回放",
+        "error.telemetry_write": "写入遥测文件失败: {error}",
         "fatal_error_prompt": "程序发生严重错误，按回车键退出..."
     },
     "en": {
@@ -60,6 +73,19 @@ DEFAULT_TRANSLATIONS = {
         "hotkey.speed_up": "Speed Up",
         "hotkey.speed_down": "Slow Down",
         "hotkey.toggle_language": "Toggle Language",
+        "status.recovered": "Recovered unfinished recording: {count} events -> {filename}",
+        "status.recover_failed": "Could not recover unfinished recording: journal is corrupt, moved to {path}",
+        "error.invalid_keys": "Unplayable key names skipped: {keys}",
+        "status.paused": "Paused",
+        "hotkey.pause": "Pause/Resume",
+        "status.simplified": "Simplified mouse path: removed {removed} of {total} events",
+        "error.hook_overrun": "Input buffer overflowed: {count} events dropped",
+        "error.backend_unavailable": "Input backend {backend} unavailable ({error}), falling back to pynput",
+        "status.coalesced": "Ready ({count} stale mouse moves coalesced)",
+        "error.slot_empty": "Library slot {slot} is empty",
+        "status.optimized": "Optimized: removed {removed} events, {saved} s shorter",
+        "error.seek_unsupported": "Timelines cannot start from a position",
+        "error.telemetry_write": "Failed to write telemetry: {error}",
         "fatal_error_prompt": "A critical error occurred. Press Enter to exit..."
     }
 }
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from macrofile import MacroData
+
+# 录制日志：追加写入的分块 JSONL 文件
+# 第一行为头部 {"journal": 版本, "target": 目标宏文件, "started": 时间戳}
+# 之后每行是一批事件 {"strings": 新增的名称, "rows": [[time, type, x, y, code, pressed, dx, dy], ...]}
+# code 指向所有批次累积的字符串表；进程崩溃时最后一行可能不完整，恢复时忽略
+JOURNAL_VERSION = 1
+JOURNAL_SUFFIX = '.journal'
+
+
+def journal_path(filename: str) -> str:
+    return filename + JOURNAL_SUFFIX
+
+
+class Journal:
+    def __init__(self, filename: str, batch_size: int = 1000, flush_interval: float = 0.5,
+                 keep: int = 0) -> None:
+        self.target = filename
+        self.path = journal_path(filename)
+        self.batch_size = max(1, int(batch_size))
+        # 缓冲上限：后台线程来不及写入时，由调用方同步刷盘，保证内存有界
+        self.max_buffer = self.batch_size * 4
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._pending = MacroData()
+        # 已写入的事件在内存中保留至多 keep 个 (与缓冲共享字符串表)，录制结束后直接交给回放；
+        # 超出上限即释放，改为从日志读回，保证内存有界
+        self.keep = keep
+        self.data: Optional[MacroData] = self._pending.take() if keep > 0 else None
+        self._strings_written = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._file = open(self.path, 'w', encoding='utf-8')
+        header = {'journal': JOURNAL_VERSION, 'target': filename, 'started': time.time()}
+        self._file.write(json.dumps(header) + '\n')
+        self._file.flush()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, time: float, type_code: int, x: float = 0, y: float = 0,
+               name: Optional[str] = None, pressed: bool = False, dx: int = 0, dy: int = 0) -> None:
+        with self._lock:
+            self._pending.append(time, type_code, x, y, name, pressed, dx, dy)
+            size = len(self._pending)
+        if size >= self.max_buffer:
+            self.flush()
+        elif size >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                batch = self._pending.take()
+                n_strings = len(self._pending.strings)
+            if not batch or self._file is None:
+                return
+            line = {'strings': batch.strings[self._strings_written:n_strings], 'rows': list(batch)}
+            self._file.write(json.dumps(line) + '\n')
+            self._file.flush()
+            self._strings_written = n_strings
+            self.count += len(batch)
+            if self.data is not None:
+                if self.count > self.keep:
+                    self.data = None
+                else:
+                    self.data.extend(batch)
+
+    def _flush_loop(self) -> None:
+        while not self._closing:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        # 写出剩余事件并关闭文件，日志保留到宏文件保存成功后再删除
+        self._closing = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def read_journal(path: str) -> Tuple[Optional[Dict[str, Any]], MacroData]:
+    # 返回 (头部, 已写入的事件)；遇到损坏或截断的行即停止
+    data = MacroData()
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None, data
+        if not isinstance(header, dict) or 'journal' not in header:
+            return None, data
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            try:
+                batch = json.loads(line)
+                names = batch['strings']
+                rows = batch['rows']
+            except (ValueError, KeyError, TypeError):
+                break
+            for name in names:
+                data.intern(name)
+            for row in rows:
+                data.append_row(tuple(row))
+    return header, data
+
+
+def find_unfinished(filename: str) -> Optional[str]:
+    path = journal_path(filename)
+    return path if os.path.exists(path) else None
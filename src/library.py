@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import macrofile
+from timeline import TIMELINE_SUFFIX
+
+INDEX_NAME = 'index.json'
+INDEX_VERSION = 1
+MACRO_EXTENSIONS = ('.json',) + macrofile.BINARY_EXTENSIONS + macrofile.COMPRESSED_EXTENSIONS
+
+# 文件标识: (修改时间 ns, 大小)，任一变化即视为文件已修改
+Stamp = Tuple[int, int]
+
+
+def file_stamp(path: str) -> Stamp:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class CachedMacro:
+    """缓存中的一个宏：解析后的数据，以及按需编译并挂在其上的回放计划。"""
+
+    def __init__(self, path: str, stamp: Optional[Stamp], data: macrofile.MacroData) -> None:
+        self.path = path
+        self.stamp = stamp
+        self.data = data
+        self.plan: Any = None
+        # 录制结果尚在后台写盘时为 True，此时文件内容不完整，不做 mtime/size 校验
+        self.pending = False
+
+
+class MacroCache:
+    """按路径缓存已解析宏的 LRU，每次取用时用 mtime/size 校验文件是否变化。"""
+
+    def __init__(self, capacity: int = 4) -> None:
+        self.capacity = max(1, capacity)
+        self._entries: 'OrderedDict[str, CachedMacro]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filename: str) -> CachedMacro:
+        # 文件不存在抛出 FileNotFoundError，格式错误抛出 MacroFormatError
+        path = os.path.abspath(filename)
+        try:
+            stamp: Optional[Stamp] = file_stamp(path)
+        except OSError as e:
+            # 文件可能仍在后台写入，此时以内存中的数据为准
+            stamp, missing = None, e
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.pending or entry.stamp == stamp):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+        if stamp is None:
+            raise missing
+        # 解析在锁外进行；被淘汰的 mmap 宏可能仍在回放，交由垃圾回收释放
+        entry = CachedMacro(path, stamp, macrofile.load(path))
+        with self._lock:
+            self.misses += 1
+            self._insert(entry)
+        return entry
+
+    def _insert(self, entry: CachedMacro) -> None:
+        self._entries[entry.path] = entry
+        self._entries.move_to_end(entry.path)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def put(self, filename: str, data: macrofile.MacroData) -> CachedMacro:
+        # 直接放入内存中的宏 (例如刚录制完成的数据)，写盘完成前由 commit 确认
+        entry = CachedMacro(os.path.abspath(filename), None, data)
+        entry.pending = True
+        with self._lock:
+            old = self._entries.get(entry.path)
+            self._insert(entry)
+        # 文件即将被覆盖，关闭被替换的数据 (二进制宏的 mmap 映射)
+        if old is not None and old.data is not data:
+            old.data.close()
+        return entry
+
+    def commit(self, entry: CachedMacro) -> None:
+        # 文件写入完成后记录其 mtime/size，之后按常规方式校验
+        try:
+            entry.stamp = file_stamp(entry.path)
+        except OSError:
+            entry.stamp = None
+        entry.pending = False
+
+    def invalidate(self, filename: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(filename), None)
+        if entry is not None:
+            entry.data.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MacroLibrary:
+    """宏库目录：按文件名排序的宏构成 1..N 号槽位，并维护事件数与时长的索引文件。
+
+    目录只在启动时 (refresh，后台线程) 列出一次；选择槽位不再扫描目录，只有回放时解析所选的文件。
+    """
+
+    def __init__(self, directory: str, cache: MacroCache) -> None:
+        self.directory = directory
+        self.cache = cache
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.entries: List[Dict[str, Any]] = []
+        self.names: Optional[List[str]] = None
+        self._index: Dict[str, Dict[str, Any]] = self._read_index()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+            return {}
+        return {entry['name']: entry for entry in data.get('macros', []) if 'name' in entry}
+
+    def _write_index(self) -> None:
+        tmp = self.index_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'macros': self.entries}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            # 索引只是加速信息，无法写入时不影响使用
+            pass
+
+    def _names(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        # 时间线文件不是单个宏，不占用槽位
+        return sorted(name for name in names
+                      if name != INDEX_NAME and os.path.splitext(name)[1].lower() in MACRO_EXTENSIONS
+                      and not name.lower().endswith(TIMELINE_SUFFIX)
+                      and os.path.isfile(os.path.join(self.directory, name)))
+
+    def refresh(self) -> None:
+        # 在后台线程中列出目录并更新索引，不阻塞调用方 (例如热键监听线程)
+        self._thread = threading.Thread(target=self.scan, daemon=True)
+        self._thread.start()
+
+    def scan(self) -> List[Dict[str, Any]]:
+        # 只有新增或被修改的文件需要解析，其余条目直接沿用索引
+        names = self._names()
+        self.names = names
+        entries = []
+        changed = False
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                mtime_ns, size = file_stamp(path)
+            except OSError:
+                continue
+            entry = self._index.get(name)
+            if entry is None or entry.get('mtime_ns') != mtime_ns or entry.get('size') != size:
+                # 直接解析而不经过缓存，避免索引挤出缓存中正要回放的宏
+                try:
+                    data = macrofile.load(path)
+                except (OSError, macrofile.MacroFormatError):
+                    continue
+                entry = {
+                    'name': name,
+                    'events': len(data),
+                    'duration': round(max(0.0, data.duration - data.start_time), 3),
+                    'mtime_ns': mtime_ns,
+                    'size': size,
+                }
+                data.close()
+                changed = True
+            entries.append(entry)
+        self.entries = entries
+        if changed or len(entries) != len(self._index):
+            self._index = {entry['name']: entry for entry in entries}
+            self._write_index()
+        return entries
+
+    def slot(self, number: int) -> Optional[str]:
+        # 槽位从 1 开始编号，对应目录中按文件名排序的顺序；尚未列出目录时只列一次，不解析文件
+        names = self.names
+        if names is None:
+            names = self.names = self._names()
+        if 1 <= number <= len(names):
+            return os.path.join(self.directory, names[number - 1])
+        return None
+
+
+def library_from_settings(config: dict, cache: MacroCache) -> MacroLibrary:
+    options = config.get('library', {})
+    return MacroLibrary(options.get('directory', 'macros'), cache)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index a macro library directory")
+    parser.add_argument('directory')
+    args = parser.parse_args()
+    library = MacroLibrary(args.directory, MacroCache())
+    for number, entry in enumerate(library.scan(), 1):
+        print(f"{number:>3}  {entry['name']:<32} {entry['events']:>10} events  {entry['duration']:>10.3f} s")
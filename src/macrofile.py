@@ -0,0 +1,826 @@
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from itertools import accumulate
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 事件类型编码
+MOVE = 0
+CLICK = 1
+SCROLL = 2
+KEY_PRESS = 3
+KEY_RELEASE = 4
+
+TYPE_NAMES = ('move', 'click', 'scroll', 'key_press', 'key_release')
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+# 二进制容器格式
+# 头部: 魔数, 版本, 保留标志, 事件数, 总时长, 字符串表偏移
+# 之后依次为按 8 字节对齐的定宽列: time(f64), x/y/code/dx/dy(i32), type/pressed(u8)
+# 最后是字符串表 (u32 长度 + UTF-8 JSON 数组)，保存按键与鼠标按钮名称
+MAGIC = b'MCRB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQdQ')
+BINARY_EXTENSIONS = ('.bin', '.mcrb')
+
+# 压缩容器格式 (归档用，体积最小)
+# 头部: 魔数, 版本, 编码 (0 = zlib, 1 = lzma), 保留, 事件数, 总时长, 首个事件时间, 字符串表长度
+# 之后是字符串表 (UTF-8 JSON 数组)，最后是压缩后的事件块序列
+# 每块最多 BLOCK_EVENTS 个事件，以 varint 字节数开头，块内按列存放：
+#   事件数, 类型 (每个 1 字节), 时间 (整数微秒的差值),
+#   x / y (仅 move / click / scroll，与上一个带坐标事件的差值), code + 1 (仅 click / 按键),
+#   pressed (仅 click，每个 1 字节), dx / dy (仅 scroll)
+# 差值与 dx / dy 使用 zigzag 编码后写为 varint，时间与坐标的差值状态跨块延续
+COMPRESSED_MAGIC = b'MCRZ'
+COMPRESSED_VERSION = 1
+COMPRESSED_HEADER = struct.Struct('<4sHBBQddI')
+COMPRESSED_EXTENSIONS = ('.mcrz',)
+CODECS = ('zlib', 'lzma')
+BLOCK_EVENTS = 4096
+
+# (列名, array 类型码, 单个元素字节数)
+COLUMNS = (
+    ('times', 'd', 8),
+    ('xs', 'i', 4),
+    ('ys', 'i', 4),
+    ('codes', 'i', 4),
+    ('dxs', 'i', 4),
+    ('dys', 'i', 4),
+    ('types', 'B', 1),
+    ('flags', 'B', 1),
+)
+
+# 单个事件行: (time, type, x, y, code, pressed, dx, dy)
+# code 是字符串表下标 (按钮或按键名称)，-1 表示无
+Row = Tuple[float, int, int, int, int, int, int, int]
+
+
+class MacroFormatError(ValueError):
+    pass
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _column_offsets(count: int) -> Dict[str, int]:
+    # 根据事件数推算各列在文件中的起始偏移
+    offsets = {}
+    pos = HEADER.size
+    for name, _, size in COLUMNS:
+        pos = _align(pos)
+        offsets[name] = pos
+        pos += size * count
+    offsets['strings'] = _align(pos)
+    return offsets
+
+
+def _le_bytes(column, typecode: str) -> bytes:
+    # 文件内统一使用小端字节序
+    if sys.byteorder == 'little':
+        return column.tobytes()
+    swapped = array(typecode, column)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _parse_header(raw: bytes):
+    # 校验头部并返回 (事件数, 总时长, 各列偏移)
+    if len(raw) < HEADER.size:
+        raise MacroFormatError("truncated header")
+    magic, version, _, count, duration, strings_offset = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise MacroFormatError("bad magic")
+    if version > VERSION:
+        raise MacroFormatError(f"unsupported version {version}")
+    offsets = _column_offsets(count)
+    if strings_offset != offsets['strings']:
+        raise MacroFormatError("truncated columns")
+    return count, duration, offsets
+
+
+def _event_row(event: Dict[str, Any], index: Dict[str, int], strings: List[str]) -> Optional[Row]:
+    # 将 JSON 事件字典转换为行元组，按键/按钮名称按需加入字符串表
+    type_code = TYPE_CODES.get(event.get('type'))
+    if type_code is None:
+        return None
+    name = event.get('button') if type_code == CLICK else event.get('key')
+    if name is None:
+        code = -1
+    else:
+        code = index.get(name)
+        if code is None:
+            code = index[name] = len(strings)
+            strings.append(name)
+    return (float(event.get('time', 0.0)), type_code,
+            int(round(event.get('x', 0))), int(round(event.get('y', 0))),
+            code, 1 if event.get('pressed') else 0,
+            int(event.get('dx', 0)), int(event.get('dy', 0)))
+
+
+class MacroData(Sequence):
+    """列式存储的宏事件序列，每个事件约 30 字节，逐行迭代时不构造字典。"""
+
+    def __init__(self, columns: Optional[Dict[str, Any]] = None, strings: Optional[List[str]] = None) -> None:
+        if columns is None:
+            columns = {name: array(code) for name, code, _ in COLUMNS}
+        self.times = columns['times']
+        self.xs = columns['xs']
+        self.ys = columns['ys']
+        self.codes = columns['codes']
+        self.dxs = columns['dxs']
+        self.dys = columns['dys']
+        self.types = columns['types']
+        self.flags = columns['flags']
+        self.strings: List[str] = strings if strings is not None else []
+        self._index: Dict[str, int] = {name: i for i, name in enumerate(self.strings)}
+
+    @classmethod
+    def from_events(cls, events: Iterable[Dict[str, Any]]) -> 'MacroData':
+        data = cls()
+        for event in events:
+            row = _event_row(event, data._index, data.strings)
+            if row is not None:
+                data.append_row(row)
+        return data
+
+    def intern(self, name: Optional[str]) -> int:
+        # 返回名称在字符串表中的下标，不存在时追加
+        if name is None:
+            return -1
+        code = self._index.get(name)
+        if code is None:
+            code = self._index[name] = len(self.strings)
+            self.strings.append(name)
+        return code
+
+    def append(self, time: float, type_code: int, x: float = 0, y: float = 0,
+               name: Optional[str] = None, pressed: bool = False, dx: int = 0, dy: int = 0) -> None:
+        # 录制回调使用的追加接口，按键/按钮名称自动写入字符串表
+        self.times.append(time)
+        self.types.append(type_code)
+        self.xs.append(int(round(x)))
+        self.ys.append(int(round(y)))
+        self.codes.append(self.intern(name))
+        self.flags.append(1 if pressed else 0)
+        self.dxs.append(int(dx))
+        self.dys.append(int(dy))
+
+    def append_row(self, row: Row) -> None:
+        t, type_code, x, y, code, pressed, dx, dy = row
+        self.times.append(t)
+        self.types.append(type_code)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.codes.append(code)
+        self.flags.append(pressed)
+        self.dxs.append(dx)
+        self.dys.append(dy)
+
+    def extend(self, other: 'MacroData') -> None:
+        # 追加共享同一字符串表的另一段事件，各列直接整块拼接
+        for name, _, _ in COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def take(self) -> 'MacroData':
+        # 取出当前所有事件并清空自身列，字符串表保持共享
+        taken = MacroData({name: getattr(self, name) for name, _, _ in COLUMNS}, self.strings)
+        taken._index = self._index
+        for name, typecode, _ in COLUMNS:
+            setattr(self, name, array(typecode))
+        return taken
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self) -> Iterator[Row]:
+        return zip(self.times, self.types, self.xs, self.ys,
+                   self.codes, self.flags, self.dxs, self.dys)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return (self.times[i], self.types[i], self.xs[i], self.ys[i],
+                self.codes[i], self.flags[i], self.dxs[i], self.dys[i])
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] if len(self.times) else 0.0
+
+    @property
+    def start_time(self) -> float:
+        return self.times[0] if len(self.times) else 0.0
+
+    def name(self, code: int) -> Optional[str]:
+        return self.strings[code] if code >= 0 else None
+
+    def to_events(self) -> List[Dict[str, Any]]:
+        # 还原为旧版 JSON 事件字典
+        events = []
+        for t, type_code, x, y, code, pressed, dx, dy in self:
+            if type_code == MOVE:
+                events.append({'type': 'move', 'time': t, 'x': x, 'y': y})
+            elif type_code == CLICK:
+                events.append({'type': 'click', 'time': t, 'x': x, 'y': y,
+                               'button': self.name(code), 'pressed': bool(pressed)})
+            elif type_code == SCROLL:
+                events.append({'type': 'scroll', 'time': t, 'x': x, 'y': y, 'dx': dx, 'dy': dy})
+            else:
+                events.append({'type': TYPE_NAMES[type_code], 'time': t, 'key': self.name(code)})
+        return events
+
+    def close(self) -> None:
+        pass
+
+
+class BinaryMacro(MacroData):
+    """通过 mmap 打开的二进制宏文件，各列直接映射为 memoryview。"""
+
+    def __init__(self, filename: str) -> None:
+        self._file = open(filename, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise MacroFormatError(f"{filename}: empty file")
+        self._views: List[memoryview] = []
+        try:
+            columns, strings, duration = self._map()
+        except Exception:
+            self.close()
+            raise
+        super().__init__(columns, strings)
+        self._duration = duration
+
+    def _map(self):
+        mm = self._mm
+        count, duration, offsets = _parse_header(mm[:HEADER.size])
+        strings_offset = offsets['strings']
+        if len(mm) < strings_offset + 4:
+            raise MacroFormatError("truncated columns")
+
+        raw = memoryview(mm)
+        self._views.append(raw)
+        columns = {}
+        for name, typecode, size in COLUMNS:
+            start = offsets[name]
+            view = raw[start:start + size * count]
+            self._views.append(view)
+            if size > 1 and sys.byteorder != 'little':
+                column = array(typecode, view.tobytes())
+                column.byteswap()
+            else:
+                column = view.cast(typecode)
+                self._views.append(column)
+            columns[name] = column
+
+        (table_len,) = struct.unpack_from('<I', mm, strings_offset)
+        table = mm[strings_offset + 4:strings_offset + 4 + table_len]
+        try:
+            strings = json.loads(table.decode('utf-8')) if table_len else []
+        except ValueError:
+            raise MacroFormatError("bad string table")
+        return columns, strings, duration
+
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    def close(self) -> None:
+        # memoryview 必须先释放，否则 mmap 无法关闭
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BinaryStream:
+    """按块读取二进制宏文件的流式视图，后台线程预读，内存占用与宏长度无关。"""
+
+    def __init__(self, filename: str, chunk_size: int = 4096, read_ahead: int = 2) -> None:
+        self.filename = filename
+        self.chunk_size = max(1, chunk_size)
+        self.read_ahead = max(1, read_ahead)
+        with open(filename, 'rb') as f:
+            self.count, self.duration, self._offsets = _parse_header(f.read(HEADER.size))
+            f.seek(self._offsets['strings'])
+            raw = f.read(4)
+            if len(raw) < 4:
+                raise MacroFormatError("truncated columns")
+            (table_len,) = struct.unpack('<I', raw)
+            try:
+                self.strings: List[str] = json.loads(f.read(table_len).decode('utf-8')) if table_len else []
+            except ValueError:
+                raise MacroFormatError("bad string table")
+            self.start_time = 0.0
+            if self.count:
+                f.seek(self._offsets['times'])
+                (self.start_time,) = struct.unpack('<d', f.read(8))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def name(self, code: int) -> Optional[str]:
+        return self.strings[code] if code >= 0 else None
+
+    def _read_chunk(self, f, start: int, n: int) -> List[array]:
+        chunk = []
+        for name, typecode, size in COLUMNS:
+            f.seek(self._offsets[name] + start * size)
+            column = array(typecode)
+            column.frombytes(f.read(n * size))
+            if size > 1 and sys.byteorder != 'little':
+                column.byteswap()
+            chunk.append(column)
+        return chunk
+
+    def _prefetch(self, chunks: 'queue.Queue', cancelled: threading.Event) -> None:
+        try:
+            with open(self.filename, 'rb') as f:
+                for start in range(0, self.count, self.chunk_size):
+                    chunk = self._read_chunk(f, start, min(self.chunk_size, self.count - start))
+                    while not cancelled.is_set():
+                        try:
+                            chunks.put(chunk, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if cancelled.is_set():
+                        return
+        except Exception as e:
+            chunks.put(e)
+            return
+        chunks.put(None)
+
+    def __iter__(self) -> Iterator[Row]:
+        chunks: queue.Queue = queue.Queue(maxsize=self.read_ahead)
+        cancelled = threading.Event()
+        worker = threading.Thread(target=self._prefetch, args=(chunks, cancelled), daemon=True)
+        worker.start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, Exception):
+                    raise MacroFormatError(str(chunk))
+                times, xs, ys, codes, dxs, dys, types, flags = chunk
+                yield from zip(times, types, xs, ys, codes, flags, dxs, dys)
+        finally:
+            cancelled.set()
+
+    def close(self) -> None:
+        pass
+
+
+class JsonStream:
+    """增量解析旧版 JSON 宏文件，边读边产出事件行。"""
+
+    BLOCK_SIZE = 1 << 16
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.duration = self._tail_time()
+        rows = iter(self)
+        first = next(rows, None)
+        rows.close()
+        self.start_time = first[0] if first is not None else 0.0
+        self._empty = first is None
+
+    def __bool__(self) -> bool:
+        return not self._empty
+
+    def name(self, code: int) -> Optional[str]:
+        return self.strings[code] if code >= 0 else None
+
+    def _tail_time(self) -> float:
+        # 从文件末尾向前查找最后一个事件对象以获取总时长，避免解析整个文件
+        decoder = json.JSONDecoder()
+        with open(self.filename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - self.BLOCK_SIZE))
+            tail = f.read().decode('utf-8', errors='ignore')
+        pos = len(tail)
+        while True:
+            pos = tail.rfind('{', 0, pos)
+            if pos < 0:
+                return 0.0
+            try:
+                obj, _ = decoder.raw_decode(tail, pos)
+            except ValueError:
+                continue
+            if isinstance(obj, dict) and 'time' in obj:
+                return float(obj['time'])
+
+    def _objects(self) -> Iterator[Dict[str, Any]]:
+        decoder = json.JSONDecoder()
+        with open(self.filename, 'r') as f:
+            buf = f.read(self.BLOCK_SIZE).lstrip()
+            if not buf.startswith('['):
+                raise MacroFormatError(f"{self.filename}: streaming requires a JSON array")
+            pos = 1
+            eof = False
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise MacroFormatError(f"{self.filename}: truncated JSON")
+                    more = f.read(self.BLOCK_SIZE)
+                    eof = not more
+                    buf = buf[pos:] + more
+                    pos = 0
+                    continue
+                if isinstance(obj, dict):
+                    yield obj
+                pos = end
+
+    def __iter__(self) -> Iterator[Row]:
+        for event in self._objects():
+            row = _event_row(event, self._index, self.strings)
+            if row is not None:
+                yield row
+
+    def close(self) -> None:
+        pass
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _write_varints(out: bytearray, values: Iterable[int]) -> None:
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7f) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _read_varints(buf: bytes, pos: int, n: int) -> Tuple[List[int], int]:
+    values = []
+    append = values.append
+    for _ in range(n):
+        b = buf[pos]
+        pos += 1
+        # 差值大多只有一个字节
+        if b < 0x80:
+            append(b)
+            continue
+        result = b & 0x7f
+        shift = 7
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7f) << shift
+            if b < 0x80:
+                break
+            shift += 7
+        append(result)
+    return values, pos
+
+
+def _deltas(values: Iterable[int], previous: int) -> List[int]:
+    out = []
+    for value in values:
+        out.append(_zigzag(value - previous))
+        previous = value
+    return out
+
+
+def _encode_block(data: MacroData, start: int, end: int, state: List[int]) -> bytes:
+    # state: [上一个时间 (微秒), 上一个 x, 上一个 y]，编码后更新
+    types = data.types[start:end]
+    positioned = [i for i in range(start, end) if data.types[i] <= SCROLL]
+    named = [i for i in range(start, end) if data.types[i] not in (MOVE, SCROLL)]
+    clicks = [i for i in range(start, end) if data.types[i] == CLICK]
+    scrolls = [i for i in range(start, end) if data.types[i] == SCROLL]
+    micros = [int(round(t * 1e6)) for t in data.times[start:end]]
+    xs = [data.xs[i] for i in positioned]
+    ys = [data.ys[i] for i in positioned]
+
+    out = bytearray()
+    _write_varints(out, (end - start,))
+    out += bytes(types)
+    _write_varints(out, _deltas(micros, state[0]))
+    _write_varints(out, _deltas(xs, state[1]))
+    _write_varints(out, _deltas(ys, state[2]))
+    _write_varints(out, (data.codes[i] + 1 for i in named))
+    out += bytes(data.flags[i] for i in clicks)
+    _write_varints(out, (_zigzag(data.dxs[i]) for i in scrolls))
+    _write_varints(out, (_zigzag(data.dys[i]) for i in scrolls))
+    if micros:
+        state[0] = micros[-1]
+    if positioned:
+        state[1], state[2] = xs[-1], ys[-1]
+    head = bytearray()
+    _write_varints(head, (len(out),))
+    return bytes(head + out)
+
+
+def _decode_block(buf: bytes, pos: int, state: List[int]) -> Tuple[List[Any], int]:
+    # 返回 (各列列表，顺序同 COLUMNS, 块结束位置)
+    (n,), pos = _read_varints(buf, pos, 1)
+    types = buf[pos:pos + n]
+    pos += n
+    deltas, pos = _read_varints(buf, pos, n)
+    micros = list(accumulate(map(_unzigzag, deltas), initial=state[0]))
+    del micros[0]
+    positioned = [i for i, t in enumerate(types) if t <= SCROLL]
+    deltas, pos = _read_varints(buf, pos, len(positioned))
+    px = list(accumulate(map(_unzigzag, deltas), initial=state[1]))
+    deltas, pos = _read_varints(buf, pos, len(positioned))
+    py = list(accumulate(map(_unzigzag, deltas), initial=state[2]))
+    named = [i for i, t in enumerate(types) if t != MOVE and t != SCROLL]
+    codes_raw, pos = _read_varints(buf, pos, len(named))
+    clicks = [i for i, t in enumerate(types) if t == CLICK]
+    flags_raw = buf[pos:pos + len(clicks)]
+    pos += len(clicks)
+    scrolls = [i for i, t in enumerate(types) if t == SCROLL]
+    dx_raw, pos = _read_varints(buf, pos, len(scrolls))
+    dy_raw, pos = _read_varints(buf, pos, len(scrolls))
+
+    if micros:
+        state[0] = micros[-1]
+    if positioned:
+        state[1], state[2] = px[-1], py[-1]
+    if len(positioned) == n:
+        # 全部是带坐标的事件 (最常见的情况)，无需按下标回填
+        xs, ys = px[1:], py[1:]
+    else:
+        xs, ys = [0] * n, [0] * n
+        for i, x, y in zip(positioned, px[1:], py[1:]):
+            xs[i] = x
+            ys[i] = y
+    codes = [-1] * n
+    for i, code in zip(named, codes_raw):
+        codes[i] = code - 1
+    flags = bytearray(n)
+    for i, flag in zip(clicks, flags_raw):
+        flags[i] = flag
+    dxs, dys = [0] * n, [0] * n
+    for i, dx, dy in zip(scrolls, dx_raw, dy_raw):
+        dxs[i] = _unzigzag(dx)
+        dys[i] = _unzigzag(dy)
+    times = [m / 1e6 for m in micros]
+    return [times, xs, ys, codes, dxs, dys, types, flags], pos
+
+
+def _decompressor(codec: int):
+    # 返回 (解压器, 数据损坏时抛出的异常类型)
+    if codec == 0:
+        return zlib.decompressobj(), zlib.error
+    if codec == 1:
+        # lzma 仅在读写 lzma 编码的文件时导入
+        import lzma
+        return lzma.LZMADecompressor(), lzma.LZMAError
+    raise MacroFormatError(f"unknown codec {codec}")
+
+
+def _compressor(codec: str):
+    if codec == 'zlib':
+        return zlib.compressobj(9)
+    if codec == 'lzma':
+        import lzma
+        return lzma.LZMACompressor(preset=9)
+    raise ValueError(f"unknown codec {codec!r}, expected one of {', '.join(CODECS)}")
+
+
+class CompressedStream:
+    """按块解压并解码压缩宏文件，内存占用与宏长度无关。"""
+
+    READ_SIZE = 1 << 16
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            raw = f.read(COMPRESSED_HEADER.size)
+            if len(raw) < COMPRESSED_HEADER.size:
+                raise MacroFormatError("truncated header")
+            magic, version, self.codec, _, self.count, self.duration, self.start_time, table_len = \
+                COMPRESSED_HEADER.unpack(raw)
+            if magic != COMPRESSED_MAGIC:
+                raise MacroFormatError("bad magic")
+            if version > COMPRESSED_VERSION:
+                raise MacroFormatError(f"unsupported version {version}")
+            table = f.read(table_len)
+            if len(table) < table_len:
+                raise MacroFormatError("truncated string table")
+        try:
+            self.strings: List[str] = json.loads(table.decode('utf-8')) if table_len else []
+        except ValueError:
+            raise MacroFormatError("bad string table")
+        self._payload = COMPRESSED_HEADER.size + table_len
+
+    def __len__(self) -> int:
+        return self.count
+
+    def name(self, code: int) -> Optional[str]:
+        return self.strings[code] if code >= 0 else None
+
+    def blocks(self) -> Iterator[List[Any]]:
+        # 边读边解压，每凑齐一个完整的块就解码产出
+        decompressor, error = _decompressor(self.codec)
+        state = [0, 0, 0]
+        buf = b''
+        decoded = 0
+        with open(self.filename, 'rb') as f:
+            f.seek(self._payload)
+            eof = False
+            while True:
+                pos = 0
+                while pos < len(buf):
+                    # 块长度前缀本身可能还不完整
+                    try:
+                        (size,), start = _read_varints(buf, pos, 1)
+                    except IndexError:
+                        break
+                    if start + size > len(buf):
+                        break
+                    try:
+                        columns, _ = _decode_block(buf[start:start + size], 0, state)
+                    except IndexError:
+                        raise MacroFormatError(f"{self.filename}: corrupt block")
+                    decoded += len(columns[0])
+                    yield columns
+                    pos = start + size
+                buf = buf[pos:]
+                if eof:
+                    break
+                raw = f.read(self.READ_SIZE)
+                try:
+                    if raw:
+                        buf += decompressor.decompress(raw)
+                    else:
+                        eof = True
+                        if hasattr(decompressor, 'flush'):
+                            buf += decompressor.flush()
+                except (error, EOFError) as e:
+                    raise MacroFormatError(f"{self.filename}: {e}")
+        # 压缩流未到结尾 (例如末尾的校验和被截断) 时，即使事件数已够也视为截断
+        if buf or decoded != self.count or not decompressor.eof:
+            raise MacroFormatError(f"{self.filename}: truncated data")
+
+    def __iter__(self) -> Iterator[Row]:
+        for times, xs, ys, codes, dxs, dys, types, flags in self.blocks():
+            yield from zip(times, types, xs, ys, codes, flags, dxs, dys)
+
+    def load(self) -> MacroData:
+        columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+        targets = [columns[name] for name, _, _ in COLUMNS]
+        for block in self.blocks():
+            for column, values in zip(targets, block):
+                if isinstance(values, (bytes, bytearray)):
+                    column.frombytes(values)
+                else:
+                    column.fromlist(values)
+        return MacroData(columns, self.strings)
+
+    def close(self) -> None:
+        pass
+
+
+def write_compressed(filename: str, data: MacroData, codec: str = 'lzma') -> None:
+    compressor = _compressor(codec)
+    table = json.dumps(data.strings, ensure_ascii=False).encode('utf-8')
+    count = len(data)
+    with open(filename, 'wb') as f:
+        f.write(COMPRESSED_HEADER.pack(COMPRESSED_MAGIC, COMPRESSED_VERSION, CODECS.index(codec), 0,
+                                       count, data.duration, data.start_time, len(table)))
+        f.write(table)
+        state = [0, 0, 0]
+        for start in range(0, count, BLOCK_EVENTS):
+            f.write(compressor.compress(_encode_block(data, start, min(start + BLOCK_EVENTS, count), state)))
+        f.write(compressor.flush())
+
+
+def open_stream(filename: str):
+    # 流式打开宏文件：二进制按列分块预读，压缩格式按块解压，JSON 数组增量解析
+    if is_binary(filename):
+        return BinaryStream(filename)
+    if is_compressed(filename):
+        return CompressedStream(filename)
+    try:
+        return JsonStream(filename)
+    except MacroFormatError:
+        # 非数组根节点 (例如 {"events": [...]}) 无法增量解析，退回整体加载
+        return load(filename)
+
+
+def _read_magic(filename: str) -> bytes:
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(MAGIC))
+    except OSError:
+        return b''
+
+
+def is_binary(filename: str) -> bool:
+    return _read_magic(filename) == MAGIC
+
+
+def is_compressed(filename: str) -> bool:
+    return _read_magic(filename) == COMPRESSED_MAGIC
+
+
+def write_binary(filename: str, data: MacroData) -> None:
+    count = len(data)
+    offsets = _column_offsets(count)
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, data.duration, offsets['strings']))
+        for name, typecode, _ in COLUMNS:
+            f.write(b'\0' * (offsets[name] - f.tell()))
+            f.write(_le_bytes(getattr(data, name), typecode))
+        f.write(b'\0' * (offsets['strings'] - f.tell()))
+        table = json.dumps(data.strings, ensure_ascii=False).encode('utf-8')
+        f.write(struct.pack('<I', len(table)))
+        f.write(table)
+
+
+def write_json(filename: str, data: MacroData) -> None:
+    with open(filename, 'w') as f:
+        json.dump(data.to_events(), f)
+
+
+def load(filename: str) -> MacroData:
+    # 根据魔数自动识别二进制与压缩格式，否则按旧版 JSON 解析
+    magic = _read_magic(filename)
+    if magic == MAGIC:
+        return BinaryMacro(filename)
+    if magic == COMPRESSED_MAGIC:
+        return CompressedStream(filename).load()
+    with open(filename, 'r') as f:
+        try:
+            data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # 魔数损坏的二进制文件也会走到这里，按格式错误报告
+            raise MacroFormatError(str(e))
+    if isinstance(data, dict):
+        data = data.get('events', [])
+    if not isinstance(data, list):
+        raise MacroFormatError("unexpected JSON root")
+    return MacroData.from_events(data)
+
+
+def save(filename: str, data: MacroData) -> None:
+    # 按扩展名选择保存格式，默认保持 JSON 兼容
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in BINARY_EXTENSIONS:
+        writer = write_binary
+    elif ext in COMPRESSED_EXTENSIONS:
+        writer = write_compressed
+    else:
+        writer = write_json
+    # 先写入同目录的临时文件再替换：原文件可能仍被 mmap 映射，原地截断后访问旧映射会触发 SIGBUS
+    tmp = filename + '.tmp'
+    try:
+        writer(tmp, data)
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def convert(src: str, dst: str) -> int:
+    data = load(src)
+    try:
+        save(dst, data)
+        return len(data)
+    finally:
+        data.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert macro files between JSON and binary formats")
+    parser.add_argument('src')
+    parser.add_argument('dst', help="output format is chosen by extension (.bin/.mcrb -> binary, .mcrz -> compressed, otherwise JSON)")
+    args = parser.parse_args()
+    print(f"{convert(args.src, args.dst)} events: {args.src} -> {args.dst}")
@@ -6,23 +6,41 @@ import platform
 # 将当前目录添加到 sys.path 以确保导入正常工作
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from settings import settings
+# 启动分析需要在其余模块导入之前安装
+from startup import profiler
+if '--profile-startup' in sys.argv:
+    profiler.install()
 
-import pynput
-from pynput import keyboard as pynput_keyboard
+from settings import settings
+profiler.mark('import settings (load settings.json)')
 
-from utils import Colors, setup_dpi_awareness, enable_vt_mode
+from utils import setup_dpi_awareness, enable_vt_mode
 from recorder import MacroRecorder
 from player import MacroPlayer
+from library import library_from_settings
 from display import display
 from i18n import t, list_languages
+import cli
+profiler.mark('import modules')
 
 class MacroApp:
     def __init__(self):
         self.old_settings = None
         self.setup_environment()
-        self.recorder = MacroRecorder()
+        profiler.mark('setup environment')
         self.player = MacroPlayer()
+        # 录制结果通过共享缓存直接交给回放
+        self.recorder = MacroRecorder(self.player.cache)
+        profiler.mark('create player and recorder')
+        self.recorder.recover()
+        profiler.mark('recover journal')
+        self.player.preload()
+        self.library = library_from_settings(settings.config, self.player.cache)
+        if settings.config['library'].get('slot_keys'):
+            self.library.refresh()
+        # 槽位热键 -> 槽位号 (从 1 开始)
+        slot_keys = settings.config['library'].get('slot_keys', [])
+        self.slot_keys = {key.replace('_', ' ').lower(): number for number, key in enumerate(slot_keys, 1)}
         self.last_speed_change = 0
         self.speed_cooldown = 0.2
 
@@ -47,6 +65,10 @@ class MacroApp:
                 pass
 
     def cleanup(self):
+        display.stop()
+        self.player.close()
+        self.recorder.wait_saved()
+
         # 显示光标
         sys.stdout.write("\033[?25h")
         sys.stdout.flush()
@@ -58,7 +80,11 @@ class MacroApp:
 
     def handle_record_toggle(self):
         if self.recorder.recording:
+            # 录制结果会覆盖宏文件，先放弃回放器仍持有的旧数据
+            self.player.release()
             self.recorder.stop()
+            # 录制结果已在缓存中，后台编译回放计划
+            self.player.preload()
         else:
             if self.player.playing:
                 display.update_status(t('prompt.stop_play_first'))
@@ -74,6 +100,19 @@ class MacroApp:
             else:
                 self.player.start()
 
+    def handle_slot(self, number):
+        # 槽位热键：回放中作为停止键，否则回放宏库中对应的宏
+        if self.player.playing:
+            self.player.stop()
+        elif self.recorder.recording:
+            display.update_status(t('prompt.stop_record_first'))
+        else:
+            filename = self.library.slot(number)
+            if filename is None:
+                display.update_status(t('error.slot_empty', slot=number))
+            else:
+                self.player.start(filename)
+
     def handle_speed_change(self, delta):
         current_time = time.time()
         if current_time - self.last_speed_change > self.speed_cooldown:
@@ -111,6 +150,10 @@ class MacroApp:
                 self.handle_speed_change(0.5)
             elif key_name == settings.get_key('speed_down'):
                 self.handle_speed_change(-0.5)
+            elif key_name == settings.get_key('pause'):
+                self.player.toggle_pause()
+            elif key_name in self.slot_keys:
+                self.handle_slot(self.slot_keys[key_name])
         except Exception:
             pass
 
@@ -118,7 +161,15 @@ class MacroApp:
         # 初始化显示热键
         display.set_hotkeys(settings.config['hotkeys'])
         display.render()
-        
+        profiler.mark('first frame')
+        display.start()
+        if profiler.enabled:
+            self.profile_startup()
+            return
+
+        # 首帧之后再导入 pynput
+        from pynput import keyboard as pynput_keyboard
+
         # 使用 pynput 注册回调
         with pynput_keyboard.Listener(on_press=self.on_press) as listener:
             try:
@@ -126,7 +177,23 @@ class MacroApp:
             except KeyboardInterrupt:
                 pass
 
+    def profile_startup(self):
+        # --profile-startup: 只启动到首帧，再补充后台预加载与热键监听的耗时后输出报告
+        if self.player._preload_thread is not None:
+            self.player._preload_thread.join()
+        profiler.mark('wait for background preload')
+        from pynput import keyboard as pynput_keyboard
+        listener = pynput_keyboard.Listener(on_press=self.on_press)
+        listener.start()
+        listener.stop()
+        profiler.mark('start hotkey listener')
+        profiler.uninstall()
+
 def main():
+    # 子命令 (play / record / convert) 以无界面方式运行，不进入交互界面
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+        sys.exit(cli.main(sys.argv[1:]))
+
     # 首次运行（无 settings.json）时提供语言提示
     if getattr(settings, 'first_run', False):
         try:
@@ -151,5 +218,9 @@ def main():
         if app:
             app.cleanup()
 
+    if profiler.enabled:
+        sys.stdout.write("\033[2J\033[H")
+        print(profiler.report())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,196 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import macrofile
+from macrofile import MacroData
+
+# 优化遍: (宏数据, 选项) -> 新的宏数据；不修改输入
+Pass = Callable[[MacroData, Dict[str, Any]], MacroData]
+
+# 未指定时按此顺序运行；空闲裁剪放在最后，以便计入前面各遍删除事件后留下的间隔
+DEFAULT_PASSES = ('noop_moves', 'autorepeat', 'scroll', 'idle')
+
+DEFAULT_OPTIONS = {
+    'max_idle': 2.0,
+    'scroll_window': 0.1,
+    'simplify_tolerance': 2.0,
+    'simplify_max_gap': 0.1,
+}
+
+
+class PassReport(NamedTuple):
+    name: str
+    events_before: int
+    events_after: int
+    duration_before: float
+    duration_after: float
+
+    @property
+    def removed(self) -> int:
+        return self.events_before - self.events_after
+
+    @property
+    def saved(self) -> float:
+        return self.duration_before - self.duration_after
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'pass': self.name,
+            'events_before': self.events_before,
+            'events_after': self.events_after,
+            'removed': self.removed,
+            'duration_before': round(self.duration_before, 3),
+            'duration_after': round(self.duration_after, 3),
+            'saved': round(self.saved, 3),
+        }
+
+
+def _span(data: MacroData) -> float:
+    return max(0.0, data.duration - data.start_time)
+
+
+def _empty_like(data: MacroData) -> MacroData:
+    # 新数据沿用原字符串表，行内的 code 无需重新映射
+    return MacroData(strings=list(data.strings))
+
+
+def drop_noop_moves(data: MacroData, options: Dict[str, Any]) -> MacroData:
+    """删除不改变光标位置的移动事件。"""
+    out = _empty_like(data)
+    last: Optional[Tuple[int, int]] = None
+    for row in data:
+        type_code, x, y = row[1], row[2], row[3]
+        if type_code == macrofile.MOVE:
+            if (x, y) == last:
+                continue
+            last = (x, y)
+        elif type_code in (macrofile.CLICK, macrofile.SCROLL):
+            # 点击与滚轮也记录了光标位置
+            last = (x, y)
+        out.append_row(row)
+    return out
+
+
+def collapse_autorepeat(data: MacroData, options: Dict[str, Any]) -> MacroData:
+    """按住按键时系统自动重复产生的按下事件只保留第一个。"""
+    out = _empty_like(data)
+    held = set()
+    for row in data:
+        type_code, code = row[1], row[4]
+        if type_code == macrofile.KEY_PRESS:
+            if code in held:
+                continue
+            held.add(code)
+        elif type_code == macrofile.KEY_RELEASE:
+            held.discard(code)
+        out.append_row(row)
+    return out
+
+
+def merge_scrolls(data: MacroData, options: Dict[str, Any]) -> MacroData:
+    """将同一位置、间隔不超过 scroll_window 秒的相邻滚轮事件合并为一次滚动。"""
+    window = options.get('scroll_window', DEFAULT_OPTIONS['scroll_window'])
+    out = _empty_like(data)
+    pending: Optional[List[Any]] = None
+    for row in data:
+        if row[1] == macrofile.SCROLL:
+            if (pending is not None and row[2] == pending[2] and row[3] == pending[3]
+                    and row[0] - pending[0] <= window):
+                pending[6] += row[6]
+                pending[7] += row[7]
+                continue
+            if pending is not None:
+                out.append_row(tuple(pending))
+            # 合并后的滚动在首个事件的时间执行
+            pending = list(row)
+            continue
+        if pending is not None:
+            out.append_row(tuple(pending))
+            pending = None
+        out.append_row(row)
+    if pending is not None:
+        out.append_row(tuple(pending))
+    return out
+
+
+def cap_idle(data: MacroData, options: Dict[str, Any]) -> MacroData:
+    """将超过 max_idle 秒的空闲间隔缩短为 max_idle 秒，之后的事件整体前移。
+
+    按住按键或鼠标按钮期间的间隔是有意的长按，保持不变。
+    """
+    max_idle = options.get('max_idle', DEFAULT_OPTIONS['max_idle'])
+    out = _empty_like(data)
+    held_keys = set()
+    held_buttons = set()
+    shift = 0.0
+    previous: Optional[float] = None
+    for row in data:
+        t, type_code, code, pressed = row[0], row[1], row[4], row[5]
+        if previous is not None and not held_keys and not held_buttons and t - previous > max_idle:
+            shift += t - previous - max_idle
+        previous = t
+        if type_code == macrofile.KEY_PRESS:
+            held_keys.add(code)
+        elif type_code == macrofile.KEY_RELEASE:
+            held_keys.discard(code)
+        elif type_code == macrofile.CLICK:
+            if pressed:
+                held_buttons.add(code)
+            else:
+                held_buttons.discard(code)
+        out.append_row((t - shift,) + row[1:] if shift else row)
+    return out
+
+
+def simplify_path(data: MacroData, options: Dict[str, Any]) -> MacroData:
+    """Ramer–Douglas–Peucker 鼠标轨迹简化 (需要 numpy)，见 simplify.py。"""
+    # 仅在使用此遍时导入 (连带导入 numpy)
+    import simplify
+    if not simplify.available():
+        return data
+    result, _ = simplify.simplify_moves(data, options.get('simplify_tolerance', DEFAULT_OPTIONS['simplify_tolerance']),
+                                        options.get('simplify_max_gap', DEFAULT_OPTIONS['simplify_max_gap']))
+    return result
+
+
+PASSES: Dict[str, Pass] = {
+    'noop_moves': drop_noop_moves,
+    'autorepeat': collapse_autorepeat,
+    'scroll': merge_scrolls,
+    'idle': cap_idle,
+    'simplify': simplify_path,
+}
+
+
+def register_pass(name: str, func: Pass) -> None:
+    # 注册自定义优化遍，之后可在 passes 列表中按名称使用
+    PASSES[name] = func
+
+
+def optimize(data: MacroData, passes: Sequence[str] = DEFAULT_PASSES,
+             options: Optional[Dict[str, Any]] = None) -> Tuple[MacroData, List[PassReport]]:
+    """依次运行各优化遍，返回 (优化后的数据, 每一遍的报告)。未知的遍名抛出 KeyError。"""
+    merged = dict(DEFAULT_OPTIONS)
+    if options:
+        merged.update(options)
+    funcs = [(name, PASSES[name]) for name in passes]
+    reports = []
+    for name, func in funcs:
+        before, span = len(data), _span(data)
+        data = func(data, merged)
+        reports.append(PassReport(name, before, len(data), span, _span(data)))
+    return data, reports
+
+
+def optimizer_from_settings(config: dict) -> Tuple[List[str], Dict[str, Any]]:
+    # 返回保存时运行的 (遍名列表, 选项)；passes 为空表示不优化
+    options = dict(config.get('optimizer', {}))
+    passes = list(options.pop('passes', []))
+    # simplify 遍沿用全局的路径简化设置
+    for key in ('simplify_tolerance', 'simplify_max_gap'):
+        if config.get(key):
+            options.setdefault(key, config[key])
+    # 设置了 simplify_tolerance 时路径简化作为第一遍运行；已在列表中时不重复添加，保证只简化一次
+    if config.get('simplify_tolerance', 0) > 0 and 'simplify' not in passes:
+        passes.insert(0, 'simplify')
+    return passes, options
+
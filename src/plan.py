@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import macrofile
+from timeindex import TimeIndex
+
+# 两次循环之间的默认间隔 (宏时间，秒)
+LOOP_GAP = 0.1
+
+# 回放计划条目: (相对首个事件的时间, 已绑定的后端方法, 参数)
+Step = Tuple[float, Callable[..., Any], Tuple[Any, ...]]
+
+
+class PlaybackPlan:
+    """宏加载时编译一次的回放计划，回放循环只需等待并调用。"""
+
+    def __init__(self, macro: Any, backend: Any, lazy: bool = False) -> None:
+        self.macro = macro
+        self.backend = backend
+        # 绑定一次，回放循环用 `action is plan.move` 识别移动事件
+        self.move = backend.move
+        self.duration: float = macro.duration
+        self.start_time: float = macro.start_time
+        self.invalid: List[str] = []
+        # 宏自身的循环设置 (普通宏文件没有，时间线文件可指定)，None 表示使用本次回放参数或全局设置
+        self.loops: Optional[int] = None
+        self.loop_gap: Optional[float] = None
+        self.max_duration: Optional[float] = None
+        self._buttons: Dict[int, Any] = {}
+        self._keys: Dict[int, Any] = {}
+        # 预先校验字符串表中的名称 (流式 JSON 的名称在读取过程中才出现，届时再校验)
+        for name in macro.strings:
+            if backend.resolve_key(name) is None and backend.resolve_button(name) is None:
+                self.invalid.append(name)
+        # 流式模式按行即时编译，避免将整个宏载入内存
+        self.steps: Optional[List[Step]] = None if lazy else list(self._compile())
+        # 定位回放用的时间索引，首次定位时建立
+        self.index: Optional[TimeIndex] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.steps) if self.steps is not None else bool(self.macro)
+
+    def __iter__(self) -> Iterator[Step]:
+        if self.steps is not None:
+            return iter(self.steps)
+        return self._compile()
+
+    def seek(self, position: Optional[float] = None, event: Optional[int] = None) -> Tuple[int, float, List[Step]]:
+        """定位到 position 秒或第 event 个事件，返回 (起始步骤下标, 起始时间, 恢复状态的步骤)。
+
+        恢复步骤将光标移到该处的位置并重新按下此前按住的按键与鼠标按钮。
+        """
+        if self.steps is None:
+            raise ValueError("seeking requires a compiled plan")
+        if self.index is None:
+            self.index = TimeIndex(self.macro)
+        index = self.index
+        if event is None:
+            event = index.event_at(max(0.0, position or 0.0))
+        event = index.first_at_same_time(max(0, event))
+        deadline = index.time_of(event)
+        state = index.state_at(event)
+        restore: List[Step] = []
+        if state.position is not None:
+            restore.append((deadline, self.move, state.position))
+        for code in sorted(state.buttons):
+            restore.append((deadline, self.backend.press_button, (self._button(code),)))
+        for code in sorted(state.keys):
+            key = self._key(code)
+            if key is not None:
+                restore.append((deadline, self.backend.press_key, (key,)))
+        # 步骤按时间有序，二分查找第一个不早于起始时间的步骤
+        lo, hi = 0, len(self.steps)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.steps[mid][0] < deadline:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo, deadline, restore
+
+    def _button(self, code: int) -> Any:
+        btn = self._buttons.get(code)
+        if btn is None:
+            name = self.macro.name(code)
+            btn = self.backend.resolve_button(name)
+            if btn is None:
+                self._report(name)
+                btn = self.backend.resolve_button('left')
+            self._buttons[code] = btn
+        return btn
+
+    def _key(self, code: int) -> Any:
+        if code not in self._keys:
+            name = self.macro.name(code)
+            key = self.backend.resolve_key(name)
+            if key is None and name:
+                self._report(name)
+            self._keys[code] = key
+        return self._keys[code]
+
+    def _report(self, name: str) -> None:
+        if name not in self.invalid:
+            self.invalid.append(name)
+
+    def _compile(self) -> Iterator[Step]:
+        start = self.start_time
+        backend = self.backend
+        move = self.move
+        mouse_press, mouse_release = backend.press_button, backend.release_button
+        scroll = backend.scroll
+        key_press, key_release = backend.press_key, backend.release_key
+        for t, type_code, x, y, code, pressed, dx, dy in self.macro:
+            deadline = t - start
+            if type_code == macrofile.MOVE:
+                yield (deadline, move, (x, y))
+            elif type_code == macrofile.CLICK:
+                yield (deadline, mouse_press if pressed else mouse_release, (self._button(code),))
+            elif type_code == macrofile.SCROLL:
+                yield (deadline, scroll, (dx, dy))
+            else:
+                key = self._key(code)
+                # 无效按键已在编译时报告，不再进入回放循环
+                if key is None:
+                    continue
+                yield (deadline, key_press if type_code == macrofile.KEY_PRESS else key_release, (key,))
@@ -1,13 +1,17 @@
+import itertools
+import sys
 import time
-import json
 import threading
-from typing import List, Dict, Optional, Union, Any
-
-from pynput import mouse as pynput_mouse
-from pynput import keyboard as pynput_keyboard
-from pynput.mouse import Button
-from pynput.keyboard import Key
+from typing import List, Dict, Optional, Any, Tuple
 
+import macrofile
+from backends import InputBackend, PynputBackend, backend_from_settings
+from macrofile import MacroData, MacroFormatError
+from plan import PlaybackPlan, LOOP_GAP
+from library import MacroCache
+from timeline import is_timeline, load_timeline
+from telemetry import RunTelemetry
+from timing import PlaybackClock, timer_from_settings, raise_thread_priority
 from settings import settings
 from display import display
 from i18n import t
@@ -16,32 +20,171 @@ class MacroPlayer:
     def __init__(self) -> None:
         self.playing: bool = False
         self.stop_event = threading.Event()
-        self.speed: float = settings.config['default_speed']
+        # 停止、变速或暂停时唤醒正在等待的回放线程，使其按新的虚拟时钟重新计算截止时间
+        self.wake_event = threading.Event()
+        self.clock = PlaybackClock(settings.config['default_speed'])
         self.play_thread: Optional[threading.Thread] = None
-        self.events: List[Dict[str, Any]] = []
-        self.pynput_mouse_controller = pynput_mouse.Controller()
-        self.pynput_keyboard_controller = pynput_keyboard.Controller()
+        # 内存模式下为 MacroData，流式模式下为 BinaryStream / JsonStream
+        self.events: Any = MacroData()
+        self.plan: Optional[PlaybackPlan] = None
+        # 已解析并编译的宏按 mtime/size 缓存，重复回放无需重新解析
+        self.cache = MacroCache(settings.config.get('library', {}).get('cache_size', 4))
+        self._streaming: bool = False
+        self._preload_thread: Optional[threading.Thread] = None
+        # 循环次数 (0 表示无限循环)、循环间隔与总时长上限 (0 表示不限制)，回放开始时确定
+        self.loops: int = 0
+        self.loop_gap: float = LOOP_GAP
+        self.max_duration: float = 0.0
+        # 定位回放时为 (起始步骤下标, 起始时间, 恢复状态的步骤)
+        self._seek: Optional[Tuple[int, float, List[Any]]] = None
+        # 已完成的循环数与当前循环的起点 (宏时间)
+        self.loops_done: int = 0
+        self._loop_offset: float = 0.0
+        # 回放中断的原因 (例如流式读取时发现文件损坏)，正常结束时为 None
+        self.error: Optional[str] = None
+        self.timer = timer_from_settings(settings.config, self.wake_event)
+        # 落后于截止时间时合并过期的鼠标移动，只执行最新位置
+        self.catch_up: bool = settings.config.get('catch_up', True)
+        self.coalesced: int = 0
+        # 启用遥测时为最近一次回放的统计，回放结束后写出
+        self.telemetry: Optional[RunTelemetry] = None
+        self._filename: str = ''
+        # 输入后端 (及其控制器) 在首次回放或预加载时才创建
+        self._backend: Optional[InputBackend] = None
+        self._backend_lock = threading.Lock()
+
+    @property
+    def backend(self) -> InputBackend:
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self._create_backend()
+        return self._backend
+
+    def close(self) -> None:
+        if self._backend is not None:
+            self._backend.close()
+
+    def _create_backend(self) -> InputBackend:
+        try:
+            return backend_from_settings(settings.config)
+        except OSError as e:
+            # 例如没有 /dev/uinput 的写权限
+            print(t('error.backend_unavailable', backend=settings.config.get('backend'), error=e), file=sys.stderr)
+            display.invalidate()
+            return PynputBackend()
+
+    @property
+    def speed(self) -> float:
+        return self.clock.speed
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self.clock.set_speed(value)
+        self.wake_event.set()
+
+    @property
+    def paused(self) -> bool:
+        return self.clock.paused
 
-    def start(self, filename: Optional[str] = None) -> None:
+    def toggle_pause(self) -> None:
+        if not self.playing:
+            return
+        if self.clock.paused:
+            self.clock.resume()
+            display.update_status(t('status.playing'))
+        else:
+            self.clock.pause()
+            display.update_status(t('status.paused'))
+        self.wake_event.set()
+
+    def preload(self, filename: Optional[str] = None) -> None:
+        # 在后台线程中预先解析并编译宏，首次回放无需等待
+        if settings.config.get('streaming_playback', False):
+            return
+        self._preload_thread = threading.Thread(target=self._preload, args=(filename,), daemon=True)
+        self._preload_thread.start()
+
+    def _preload(self, filename: Optional[str]) -> None:
+        try:
+            entry = self.cache.get(filename or settings.config['macro_filename'])
+        except (OSError, MacroFormatError):
+            # 宏文件尚不存在或已损坏，回放时再报告
+            return
+        if entry.plan is None or entry.plan.backend is not self.backend:
+            entry.plan = PlaybackPlan(entry.data, self.backend)
+
+    def release(self) -> None:
+        # 宏文件即将被覆盖 (例如录制结束)：放弃对旧数据与回放计划的引用，由缓存负责关闭
+        if self.playing:
+            return
+        if self._preload_thread is not None:
+            self._preload_thread.join()
+            self._preload_thread = None
+        if self._streaming:
+            self.events.close()
+            self._streaming = False
+        self.events = MacroData()
+        self.plan = None
+        self._seek = None
+
+    def start(self, filename: Optional[str] = None, loops: Optional[int] = None,
+              gap: Optional[float] = None, max_duration: Optional[float] = None,
+              position: Optional[float] = None, event: Optional[int] = None) -> bool:
+        # position / event 指定从第几秒或第几个事件开始回放 (仅第一轮)，之后的循环从头开始
         if filename is None:
             filename = settings.config['macro_filename']
         if self.playing:
-            return
+            return False
+        # 预加载尚未完成时等待其结束，避免重复解析
+        if self._preload_thread is not None:
+            self._preload_thread.join()
+            self._preload_thread = None
+        seeking = position is not None or event is not None
+        # 定位需要随机访问，始终载入内存 (二进制文件为 mmap 映射)
+        streaming = settings.config.get('streaming_playback', False) and not seeking
+        timeline = is_timeline(filename)
+        if timeline and seeking:
+            display.update_status(t('error.seek_unsupported'))
+            return False
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    self.events = data
-                elif isinstance(data, dict):
-                    self.events = data.get('events', [])
-            
+            if timeline:
+                # 多轨时间线：各轨道的宏经缓存加载，由一个调度器合并回放
+                plan = load_timeline(filename, self.cache, self.backend)
+                # 时间线没有单一的事件序列，以合并后的计划代替
+                events = plan
+                streaming = False
+            elif streaming:
+                events = macrofile.open_stream(filename)
+            else:
+                entry = self.cache.get(filename)
+                events = entry.data
         except FileNotFoundError:
             display.update_status(t('error.macro_missing'))
-            return
-        except json.JSONDecodeError:
+            return False
+        except MacroFormatError:
             display.update_status(t('error.macro_invalid'))
-            return
+            return False
+        # 释放上一次流式回放打开的文件；缓存中的宏由缓存管理
+        if self._streaming:
+            self.events.close()
+        self._streaming = streaming
+        self.events = events
+        self._filename = filename
+        if timeline:
+            self.plan = plan
+        elif streaming:
+            self.plan = PlaybackPlan(events, self.backend, lazy=True)
+        else:
+            if entry.plan is None or entry.plan.backend is not self.backend:
+                entry.plan = PlaybackPlan(events, self.backend)
+            self.plan = entry.plan
+        self._seek = self.plan.seek(position, event) if seeking else None
 
+        # 优先级：本次回放的参数 > 宏自身的设置 > 全局设置
+        self.loops = max(0, int(self._option(loops, self.plan.loops, 'loop_count', 0)))
+        self.loop_gap = max(0.0, float(self._option(gap, self.plan.loop_gap, 'loop_gap', LOOP_GAP)))
+        self.max_duration = max(0.0, float(self._option(max_duration, self.plan.max_duration, 'max_duration', 0)))
         self.playing = True
         self.stop_event.clear()
         
@@ -50,97 +193,182 @@ class MacroPlayer:
 
         self.play_thread = threading.Thread(target=self._play_loop)
         self.play_thread.start()
+        return True
+
+    @staticmethod
+    def _option(value: Any, macro_value: Any, key: str, default: Any) -> Any:
+        if value is not None:
+            return value
+        if macro_value is not None:
+            return macro_value
+        return settings.config.get(key, default)
+
+    def progress(self) -> Tuple[int, float, float]:
+        # 返回 (已完成的循环数, 当前循环内的位置, 单次循环时长)，供外部轮询
+        plan = self.plan
+        if plan is None:
+            return self.loops_done, 0.0, 0.0
+        span = max(0.0, plan.duration - plan.start_time)
+        return self.loops_done, min(max(0.0, self.clock.position() - self._loop_offset), span), span
 
     def stop(self) -> None:
         if not self.playing:
             return
         self.playing = False
         self.stop_event.set()
+        self.wake_event.set()
         display.update_status(t('status.stopping'))
         if hasattr(self, 'play_thread') and self.play_thread:
             self.play_thread.join()
 
-    def _handle_move(self, event: Dict[str, Any]) -> None:
-        self.pynput_mouse_controller.position = (event['x'], event['y'])
-
-    def _handle_click(self, event: Dict[str, Any]) -> None:
-        btn_str = event.get('button', 'left')
-        btn = getattr(Button, btn_str, Button.left)
-        if event['pressed']:
-            self.pynput_mouse_controller.press(btn)
-        else:
-            self.pynput_mouse_controller.release(btn)
+    def _play_loop(self) -> None:
+        if not self.plan:
+            self.playing = False
+            display.update_status(t('status.ready'))
+            return
 
-    def _handle_scroll(self, event: Dict[str, Any]) -> None:
-        self.pynput_mouse_controller.scroll(event.get('dx', 0), event.get('dy', 0))
+        # 总时长来自文件头 (二进制) 或最后一列时间，无需遍历事件
+        total_duration = self.plan.duration
+        if settings.config.get('realtime_priority', False):
+            raise_thread_priority()
 
-    def _handle_key(self, event: Dict[str, Any]) -> None:
-        key = event.get('key')
-        if not key: return
-        
+        # 流式模式下文件在回放过程中才被读取，损坏时在此处报告
+        self.coalesced = 0
+        self.loops_done = 0
+        self.error = None
+        options = settings.config.get('telemetry', {})
+        self.telemetry = RunTelemetry(self._filename, options.get('late_threshold', 0.005), self.plan.backend) \
+            if options.get('enabled', False) else None
         try:
-            # 尝试获取 Key 对象 (例如 Key.enter)
-            k = getattr(Key, key, key)
-            if event['type'] == 'key_press':
-                self.pynput_keyboard_controller.press(k)
+            self._run_loops(total_duration)
+            if self.coalesced:
+                status = t('status.coalesced', count=self.coalesced)
             else:
-                self.pynput_keyboard_controller.release(k)
-        except Exception:
-            pass
+                status = t('status.ready')
+        except MacroFormatError:
+            status = self.error = t('error.macro_invalid')
+        # 无法回放的按键名称在回放结束时统一报告：流式模式下这些名称在回放过程中才被发现
+        if self.plan.invalid and not self.error:
+            status = t('error.invalid_keys', keys=', '.join(self.plan.invalid))
+        if self.telemetry is not None:
+            self._write_telemetry(options)
+        
+        self.playing = False
+        display.update_status(status)
+        display.update_progress(0, 0)
 
-    def _play_loop(self) -> None:
-        if not self.events:
-            self.playing = False
-            display.update_status(t('status.ready'))
-            return
+    def _write_telemetry(self, options: Dict[str, Any]) -> None:
+        if self.error:
+            result = 'error'
+        elif self.stop_event.is_set():
+            result = 'stopped'
+        else:
+            result = 'completed'
+        self.telemetry.finish(result, self.coalesced)
+        try:
+            self.telemetry.write(options.get('json_file'), options.get('prometheus_file'))
+        except OSError as e:
+            print(t('error.telemetry_write', error=e), file=sys.stderr)
+            display.invalidate()
+
+    def _wait_for(self, position: float) -> bool:
+        # 等待虚拟时钟到达指定宏时间；被停止时返回 False
+        while True:
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                return False
+            deadline = self.clock.deadline(position)
+            if deadline is None:
+                # 暂停中，等待恢复或停止
+                self.wake_event.wait()
+                continue
+            if not self.timer.wait_until(deadline):
+                return True
 
-        total_duration = self.events[-1]['time'] if self.events else 0.0
+    def _run_loops(self, total_duration: float) -> None:
         last_progress_update = 0.0
+        span = max(0.0, total_duration - self.plan.start_time)
+        # 计划只编译一次，每轮复用；每轮的起点按 轮次 × 周期 计算而非逐轮累加，上千轮后也不会漂移
+        period = span + self.loop_gap
+        if period <= 0:
+            # 时长为 0 的宏 (例如只有一个事件) 在无间隔时保留最小间隔，避免无限循环空转
+            period = LOOP_GAP
+        loop_offset = self._loop_offset = 0.0
+        move = self.plan.move
+        if self._seek is not None:
+            # 从指定位置开始：时钟从起始时间走起，先恢复光标位置与按住的按键
+            first, origin, restore = self._seek
+            steps = itertools.islice(self.plan.steps, first, None)
+            self.clock.start(origin)
+            for _, action, args in restore:
+                try:
+                    action(*args)
+                except Exception as e:
+                    print(t('error.playback', error=e), file=sys.stderr)
+                    display.invalidate()
+        else:
+            origin = 0.0
+            steps = iter(self.plan)
+            self.clock.start()
+        # 总时长上限从本次回放的起点算起
+        limit = origin + self.max_duration if self.max_duration else float('inf')
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.begin_loop()
 
         while self.playing:
-            start_time = time.perf_counter()
-            event_start_time = self.events[0]['time']
-            
-            for event in self.events:
-                if self.stop_event.is_set():
+            step = next(steps, None)
+            while step is not None:
+                deadline, action, args = step
+                # 超过总时长上限的事件不再执行
+                if loop_offset + deadline > limit:
+                    return
+                # 预读下一步，用于判断当前移动是否已被后续移动取代
+                upcoming = next(steps, None)
+
+                # 下一个移动也已到期时直接跳过当前移动，无需等待；点击、按键与滚轮从不合并
+                if (self.catch_up and action is move and upcoming is not None and upcoming[1] is move
+                        and self.clock.position() >= loop_offset + upcoming[0]):
+                    self.coalesced += 1
+                    step = upcoming
+                    continue
+
+                if not self._wait_for(loop_offset + deadline):
                     break
 
-                # 计算目标时间
-                target_time = (event['time'] - event_start_time) / self.speed
-                current_elapsed = time.perf_counter() - start_time
-                
                 # 定期更新进度 (每 0.1 秒)
                 if time.perf_counter() - last_progress_update > 0.1:
-                    display.update_progress(min(current_elapsed * self.speed, total_duration), total_duration)
+                    display.update_progress(min(max(0.0, self.clock.position() - loop_offset), span), span)
                     last_progress_update = time.perf_counter()
 
-                wait_time = target_time - current_elapsed
-                if wait_time > 0:
-                    time.sleep(wait_time)
-
+                if telemetry is not None:
+                    due = self.clock.deadline(loop_offset + deadline)
+                    if due is not None:
+                        telemetry.record(action, time.perf_counter() - due)
                 try:
-                    if event['type'] == 'move':
-                        self._handle_move(event)
-                    elif event['type'] == 'click':
-                        self._handle_click(event)
-                    elif event['type'] == 'scroll':
-                        self._handle_scroll(event)
-                    elif event['type'] in ('key_press', 'key_release'):
-                        self._handle_key(event)
+                    action(*args)
                 except Exception as e:
-                    print(t('error.playback', error=e))
+                    print(t('error.playback', error=e), file=sys.stderr)
+                    display.invalidate()
+                    if telemetry is not None:
+                        telemetry.error(action)
+                step = upcoming
             
-            # 循环结束时更新进度到 100%
-            display.update_progress(total_duration, total_duration)
-
-            # 循环检查
-            if not self.stop_event.is_set():
-                time.sleep(0.1) # 循环之间的小暂停
-            else:
+            if self.stop_event.is_set():
                 break
-        
-        self.playing = False
-        display.update_status(t('status.ready'))
-        display.update_progress(0, 0)
 
+            # 循环结束时更新进度到 100%
+            display.update_progress(span, span)
+            self.loops_done += 1
+            if telemetry is not None:
+                telemetry.end_loop()
+            if self.loops and self.loops_done >= self.loops:
+                break
 
+            # 循环之间的间隔
+            loop_offset = self._loop_offset = self.loops_done * period
+            if loop_offset > limit or not self._wait_for(loop_offset):
+                break
+            steps = iter(self.plan)
+            if telemetry is not None:
+                telemetry.begin_loop()
@@ -1,87 +1,176 @@
 import time
-import json
 import os
 import sys
-from typing import List, Dict, Optional, Union
-
-from pynput import mouse as pynput_mouse
-from pynput import keyboard as pynput_keyboard
+import threading
+from typing import Dict, Optional
 
+import macrofile
+from sampler import MoveSampler, sampler_from_settings
+from ringbuffer import RingBuffer, HookStats
+from journal import Journal, read_journal, find_unfinished
+from library import MacroCache
+from optimize import optimize, optimizer_from_settings
 from settings import settings
 from display import display
 from i18n import t
 
 class MacroRecorder:
-    def __init__(self) -> None:
-        self.events: List[Dict] = []
+    def __init__(self, cache: Optional[MacroCache] = None) -> None:
+        # 仅在日志无法创建时作为内存兜底，正常录制时事件分批写入日志
+        self.events = macrofile.MacroData()
+        self.journal: Optional[Journal] = None
         self.start_time: float = 0.0
         self.recording: bool = False
         self.last_record_time: float = 0.0
         self.sample_rate: float = settings.config.get('sample_rate', 0.016)
+        # 启用自适应采样时替代固定间隔的 sample_rate
+        self.sampler: Optional[MoveSampler] = sampler_from_settings(settings.config)
         self.pynput_mouse_listener = None
         self.pynput_keyboard_listener = None
+        self.hook_buffer = RingBuffer(settings.config.get('hook_buffer_size', 65536))
+        self.mouse_hook_stats = HookStats()
+        self.keyboard_hook_stats = HookStats()
+        self.consume_interval = 0.005
+        self._consumer_stop = threading.Event()
+        self._consumer: Optional[threading.Thread] = None
+        # 录制结果直接放入回放缓存，写盘在后台线程进行
+        self.cache = cache
+        self._writer: Optional[threading.Thread] = None
+        # 最近一次录制的事件数与保存结果
+        self.last_count: int = 0
+        self.saved: bool = False
+
+    def _emit(self, elapsed: float, type_code: int, x: float = 0, y: float = 0,
+              name: Optional[str] = None, pressed: bool = False, dx: int = 0, dy: int = 0) -> None:
+        if self.journal is not None:
+            self.journal.append(elapsed, type_code, x, y, name, pressed, dx, dy)
+        else:
+            self.events.append(elapsed, type_code, x, y, name, pressed, dx, dy)
 
     # Pynput 回调函数
+    # 回调运行在系统钩子线程上，只记录时间戳并写入环形缓冲区，其余处理交给消费者线程
     def _pynput_on_move(self, x, y):
         if not self.recording: return
-        current_time = time.perf_counter()
-        if current_time - self.last_record_time < self.sample_rate:
-            return
-        self.last_record_time = current_time
-        elapsed = current_time - self.start_time
-        self.events.append({'type': 'move', 'time': elapsed, 'x': x, 'y': y})
+        now = time.perf_counter()
+        self.hook_buffer.push(now, macrofile.MOVE, x, y)
+        self.mouse_hook_stats.add(time.perf_counter() - now)
 
     def _pynput_on_click(self, x, y, button, pressed):
         if not self.recording: return
-        elapsed = time.perf_counter() - self.start_time
-        self.events.append({
-            'type': 'click', 'time': elapsed, 'x': x, 'y': y,
-            'button': str(button).replace('Button.', ''), 'pressed': pressed
-        })
+        now = time.perf_counter()
+        self.hook_buffer.push(now, macrofile.CLICK, x, y, button, pressed)
+        self.mouse_hook_stats.add(time.perf_counter() - now)
 
     def _pynput_on_scroll(self, x, y, dx, dy):
         if not self.recording: return
-        elapsed = time.perf_counter() - self.start_time
-        self.events.append({
-            'type': 'scroll', 'time': elapsed, 'x': x, 'y': y, 'dx': dx, 'dy': dy
-        })
+        now = time.perf_counter()
+        self.hook_buffer.push(now, macrofile.SCROLL, x, y, dx, dy)
+        self.mouse_hook_stats.add(time.perf_counter() - now)
 
     def _pynput_on_press(self, key):
         if not self.recording: return
-        try:
-            k = key.char
-        except AttributeError:
-            k = str(key).replace('Key.', '')
-        
-        # 停止键检查 (简化版)
-        if k == self.stop_key: return
-
-        elapsed = time.perf_counter() - self.start_time
-        self.events.append({'type': 'key_press', 'time': elapsed, 'key': k})
+        now = time.perf_counter()
+        self.hook_buffer.push(now, macrofile.KEY_PRESS, key)
+        self.keyboard_hook_stats.add(time.perf_counter() - now)
 
     def _pynput_on_release(self, key):
         if not self.recording: return
-        try:
-            k = key.char
-        except AttributeError:
-            k = str(key).replace('Key.', '')
-            
-        if k == self.stop_key: return
+        now = time.perf_counter()
+        self.hook_buffer.push(now, macrofile.KEY_RELEASE, key)
+        self.keyboard_hook_stats.add(time.perf_counter() - now)
+
+    # 消费者线程：规范化原始条目并写入日志
+    def _consume_loop(self) -> None:
+        while not self._consumer_stop.wait(self.consume_interval):
+            for item in self.hook_buffer.drain():
+                self._consume(item)
+        # 监听器已停止，处理剩余条目
+        for item in self.hook_buffer.drain():
+            self._consume(item)
+
+    def _consume(self, item) -> None:
+        _, now, kind, a, b, c, d = item
+        elapsed = now - self.start_time
+        if kind == macrofile.MOVE:
+            if self.sampler is not None:
+                if not self.sampler.accept(a, b, now):
+                    return
+            elif now - self.last_record_time < self.sample_rate:
+                return
+            self.last_record_time = now
+            self._emit(elapsed, macrofile.MOVE, a, b)
+        elif kind == macrofile.CLICK:
+            self._flush_move()
+            self._emit(elapsed, macrofile.CLICK, a, b, str(c).replace('Button.', ''), d)
+        elif kind == macrofile.SCROLL:
+            self._flush_move()
+            self._emit(elapsed, macrofile.SCROLL, a, b, dx=c, dy=d)
+        else:
+            self._flush_move()
+            try:
+                k = a.char
+            except AttributeError:
+                k = str(a).replace('Key.', '')
+
+            # 停止键检查 (简化版)
+            if k == self.stop_key: return
+
+            self._emit(elapsed, kind, name=k)
+
+    def _flush_move(self) -> None:
+        # 自适应采样可能跳过了最后一段小位移，其他事件之前与录制结束时补记光标落点
+        if self.sampler is None:
+            return
+        pending = self.sampler.flush()
+        if pending is not None:
+            x, y, when = pending
+            self._emit(when - self.start_time, macrofile.MOVE, x, y)
+
+    def recorded_count(self) -> int:
+        # 录制中已写入日志的事件数 (不含尚在缓冲中的)
+        if self.journal is not None:
+            return self.journal.count
+        return len(self.events)
 
-        elapsed = time.perf_counter() - self.start_time
-        self.events.append({'type': 'key_release', 'time': elapsed, 'key': k})
+    def hook_stats(self) -> Dict:
+        return {
+            'mouse': self.mouse_hook_stats.as_dict(),
+            'keyboard': self.keyboard_hook_stats.as_dict(),
+            'overruns': self.hook_buffer.overruns,
+        }
 
     def start(self) -> None:
         if self.recording:
             return
-        self.events = []
+        # 上一次录制仍在写盘时等待其完成，避免两次写入同一文件
+        self.wait_saved()
+        self.events = macrofile.MacroData()
+        try:
+            self.journal = Journal(settings.config['macro_filename'],
+                                   settings.config.get('journal_batch_size', 1000),
+                                   settings.config.get('journal_flush_interval', 0.5),
+                                   settings.config.get('handoff_max_events', 1000000) if self.cache is not None else 0)
+        except OSError:
+            self.journal = None
         self.recording = True
         self.start_time = time.perf_counter()
         self.last_record_time = self.start_time
+        if self.sampler is not None:
+            self.sampler.reset()
         
         self.stop_key = settings.get_key('record')
+        self.hook_buffer = RingBuffer(self.hook_buffer.capacity)
+        self.mouse_hook_stats = HookStats()
+        self.keyboard_hook_stats = HookStats()
+        self._consumer_stop.clear()
+        self._consumer = threading.Thread(target=self._consume_loop, daemon=True)
+        self._consumer.start()
         display.update_status(t('status.recording'))
 
+        # 首次录制时才导入 pynput，缩短启动时间
+        from pynput import mouse as pynput_mouse
+        from pynput import keyboard as pynput_keyboard
+
         self.pynput_mouse_listener = pynput_mouse.Listener(
             on_move=self._pynput_on_move,
             on_click=self._pynput_on_click,
@@ -104,19 +193,113 @@ class MacroRecorder:
         if self.pynput_keyboard_listener:
             self.pynput_keyboard_listener.stop()
             self.pynput_keyboard_listener = None
+        if self._consumer:
+            self._consumer_stop.set()
+            self._consumer.join()
+            self._consumer = None
+        # 缓冲已全部处理，补记最后一段被采样跳过的移动
+        self._flush_move()
             
         display.update_status(t('status.saving'))
-        self.save()
-        display.update_status(t('status.ready'))
+        journal = self.journal
+        self.journal = None
+        if journal is not None:
+            journal.close()
+        filename = settings.config['macro_filename']
+        data = self._prepare(journal)
+        self.last_count = len(data)
+        if self.cache is None:
+            self._write(filename, data, journal, None)
+            return
+        # 回放可以立即使用内存中的录制结果，无需等待写盘或重新解析
+        entry = self.cache.put(filename, data)
+        ready = self._ready_status()
+        display.update_status(ready)
+        self._writer = threading.Thread(target=self._write, args=(filename, data, journal, entry, ready))
+        self._writer.start()
+
+    def _ready_status(self) -> str:
+        if self.hook_buffer.overruns:
+            return t('error.hook_overrun', count=self.hook_buffer.overruns)
+        return t('status.ready')
+
+    def _write(self, filename: str, data: macrofile.MacroData, journal: Optional[Journal],
+               entry, ready: Optional[str] = None) -> None:
+        # entry 不为空时在后台线程中运行，成功提示不覆盖回放等之后出现的状态
+        saved = self.saved = self.save(filename, data, quiet=entry is not None)
+        if saved and journal is not None:
+            journal.discard()
+        if entry is None:
+            display.update_status(self._ready_status())
+        elif saved:
+            self.cache.commit(entry)
+            display.update_status_if(ready, t('status.saved', filename=filename))
+        else:
+            self.cache.invalidate(filename)
+
+    def wait_saved(self) -> None:
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def recover(self) -> None:
+        # 检测上次未正常结束的录制日志，并将其中已写入的事件保存为宏文件
+        path = find_unfinished(settings.config['macro_filename'])
+        if path is None:
+            return
+        try:
+            header, data = read_journal(path)
+        except (OSError, ValueError):
+            header = None
+        if header is None:
+            # 头部损坏或被截断：改名保留以便排查，避免之后每次启动都再次发现它
+            corrupt = path + '.corrupt'
+            try:
+                os.replace(path, corrupt)
+            except OSError:
+                corrupt = path
+            display.update_status(t('status.recover_failed', path=corrupt))
+            return
+        filename = header.get('target') or settings.config['macro_filename']
+        try:
+            macrofile.save(filename, data)
+        except Exception as e:
+            display.update_status(t('status.save_failed', error=e))
+            return
+        os.remove(path)
+        display.update_status(t('status.recovered', count=len(data), filename=filename))
 
-    def save(self, filename: Optional[str] = None) -> None:
+    def _prepare(self, journal: Optional[Journal]) -> macrofile.MacroData:
+        # 日志在内存中保留了全部事件时直接使用，否则从日志读回
+        if journal is None:
+            data = self.events
+        elif journal.data is not None:
+            data = journal.data
+        else:
+            _, data = read_journal(journal.path)
+        # 路径简化 (simplify_tolerance) 也作为优化遍运行，见 optimizer_from_settings
+        passes, options = optimizer_from_settings(settings.config)
+        if passes:
+            total = len(data)
+            data, reports = optimize(data, passes, options)
+            if passes == ['simplify']:
+                display.update_status(t('status.simplified', removed=total - len(data), total=total))
+            else:
+                display.update_status(t('status.optimized', removed=total - len(data),
+                                        saved=f"{sum(report.saved for report in reports):.1f}"))
+        return data
+
+    def save(self, filename: Optional[str] = None, data: Optional[macrofile.MacroData] = None,
+             quiet: bool = False) -> bool:
         if filename is None:
             filename = settings.config['macro_filename']
-        
+        if data is None:
+            data = self._prepare(self.journal)
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.events, f)
-            display.update_status(t('status.saved', filename=filename))
+            macrofile.save(filename, data)
+            if not quiet:
+                display.update_status(t('status.saved', filename=filename))
+            return True
         except Exception as e:
             # 如果相对路径失败，尝试保存到脚本/可执行文件的目录
             try:
@@ -128,9 +311,12 @@ class MacroRecorder:
                     # 但让我们先尝试脚本目录或当前工作目录。
                 
                 abs_path = os.path.join(base_dir, os.path.basename(filename))
-                with open(abs_path, 'w') as f:
-                    json.dump(self.events, f)
-                display.update_status(t('status.saved', filename=os.path.basename(abs_path)))
+                macrofile.save(abs_path, data)
+                if not quiet:
+                    display.update_status(t('status.saved', filename=os.path.basename(abs_path)))
+                return True
             except Exception as e2:
                 display.update_status(t('status.save_failed', error=e))
-                print(f"\n{t('status.save_failed_detail', error=e)}")
+                print(f"\n{t('status.save_failed_detail', error=e)}", file=sys.stderr)
+                display.invalidate()
+                return False
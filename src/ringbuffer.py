@@ -0,0 +1,76 @@
+import itertools
+import threading
+from typing import Any, Dict, List, Tuple
+
+# 环形缓冲区条目: (序号, 时间戳, 类型, a, b, c, d)
+Item = Tuple[int, float, int, Any, Any, Any, Any]
+
+
+class RingBuffer:
+    """预分配的多生产者 / 单消费者环形缓冲区，供系统钩子回调使用。
+
+    生产者只取序号并写入槽位，不加锁；缓冲区满时丢弃新条目并计入 overruns。
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        size = 1 << (max(2, capacity) - 1).bit_length()
+        self.capacity = size
+        self._mask = size - 1
+        self._slots: List[Any] = [None] * size
+        # itertools.count 的 next() 在 GIL 下是原子的，多个监听线程可安全取号
+        self._seq = itertools.count()
+        self._read = 0
+        self._dropped = set()
+        self._overrun_lock = threading.Lock()
+        self.overruns = 0
+
+    def push(self, t: float, kind: int, a: Any = 0, b: Any = 0, c: Any = 0, d: Any = 0) -> bool:
+        seq = next(self._seq)
+        if seq - self._read > self._mask:
+            # 消费者跟不上：记录被丢弃的序号，消费者读到该序号时跳过
+            with self._overrun_lock:
+                self._dropped.add(seq)
+                self.overruns += 1
+            return False
+        self._slots[seq & self._mask] = (seq, t, kind, a, b, c, d)
+        return True
+
+    def drain(self) -> List[Item]:
+        # 仅由消费者线程调用，按序号顺序取出所有已写入的条目
+        items = []
+        slots, mask, read = self._slots, self._mask, self._read
+        while True:
+            item = slots[read & mask]
+            if item is None or item[0] != read:
+                if read in self._dropped:
+                    self._dropped.discard(read)
+                    read += 1
+                    continue
+                # 尚未写入 (生产者已取号但还未写槽位)
+                break
+            items.append(item)
+            read += 1
+        self._read = read
+        return items
+
+
+class HookStats:
+    """单个监听线程的回调耗时统计，只由该线程写入。"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency: float) -> None:
+        self.calls += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'calls': self.calls,
+            'mean_latency_us': round(self.total / self.calls * 1e6, 2) if self.calls else 0.0,
+            'max_latency_us': round(self.max * 1e6, 2),
+        }
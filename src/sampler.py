@@ -0,0 +1,81 @@
+import math
+from typing import Optional, Tuple
+
+
+class MoveSampler:
+    """基于位移与方向变化的自适应鼠标移动采样。
+
+    与上一个记录点相比位移超过 distance，或位移达到其一半且方向变化超过 angle 度时记录；
+    两次记录至少间隔 min_interval，移动中至多间隔 max_interval 记录一次；
+    位移不超过 jitter 像素的抖动一律丢弃。
+    """
+
+    def __init__(self, min_interval: float = 0.004, max_interval: float = 0.1,
+                 distance: float = 8.0, angle: float = 20.0, jitter: float = 2.0) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.distance = distance
+        self.angle = math.radians(angle)
+        self.jitter = jitter
+        self._last: Optional[Tuple[float, float, float]] = None
+        self._heading: Optional[float] = None
+        self._pending: Optional[Tuple[float, float, float]] = None
+
+    def reset(self) -> None:
+        self._last = None
+        self._heading = None
+        self._pending = None
+
+    def accept(self, x: float, y: float, now: float) -> bool:
+        last = self._last
+        if last is None:
+            self._record(x, y, now, None)
+            return True
+        lx, ly, lt = last
+        dx, dy = x - lx, y - ly
+        dist = math.hypot(dx, dy)
+        if dist <= self.jitter:
+            return False
+        # 未记录的最新位置，供点击/滚轮前补记光标落点
+        self._pending = (x, y, now)
+        dt = now - lt
+        if dt < self.min_interval:
+            return False
+        heading = math.atan2(dy, dx)
+        # 很短的位移方向不可靠 (慢速移动时逐像素抖动)，达到 distance 的一半后才判断转向
+        if (dist >= self.distance or dt >= self.max_interval
+                or (dist >= self.distance / 2 and self._turned(heading))):
+            self._record(x, y, now, heading)
+            return True
+        return False
+
+    def _turned(self, heading: float) -> bool:
+        if self._heading is None:
+            return False
+        diff = abs(heading - self._heading) % (2 * math.pi)
+        return min(diff, 2 * math.pi - diff) > self.angle
+
+    def _record(self, x: float, y: float, now: float, heading: Optional[float]) -> None:
+        self._last = (x, y, now)
+        if heading is not None:
+            self._heading = heading
+        self._pending = None
+
+    def flush(self) -> Optional[Tuple[float, float, float]]:
+        # 返回尚未记录的最终光标位置 (x, y, 时间) 并将其视为已记录
+        pending = self._pending
+        if pending is not None:
+            lx, ly, _ = self._last
+            self._record(pending[0], pending[1], pending[2], math.atan2(pending[1] - ly, pending[0] - lx))
+        return pending
+
+
+def sampler_from_settings(config: dict) -> Optional[MoveSampler]:
+    options = config.get('adaptive_sampling', {})
+    if not options.get('enabled', False):
+        return None
+    return MoveSampler(options.get('min_interval', 0.004),
+                       options.get('max_interval', 0.1),
+                       options.get('distance', 8.0),
+                       options.get('angle', 20.0),
+                       options.get('jitter', 2.0))
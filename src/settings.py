@@ -1,4 +1,5 @@
 import json
+import sys
 
 class Settings:
     def __init__(self, filename='settings.json'):
@@ -9,11 +10,53 @@ class Settings:
                 "record": "f8",
                 "play": "f9",
                 "speed_up": "page up",
-                "speed_down": "page down"
+                "speed_down": "page down",
+                "pause": "f7"
             },
             "default_speed": 1.0,
+            "backend": "pynput",
+            "uinput_screen_size": [1920, 1080],
             "macro_filename": "macro.json",
             "sample_rate": 0.016,
+            "journal_batch_size": 1000,
+            "journal_flush_interval": 0.5,
+            "handoff_max_events": 1000000,
+            "hook_buffer_size": 65536,
+            "streaming_playback": False,
+            "timing_mode": "sleep",
+            "spin_threshold": 0.002,
+            "realtime_priority": False,
+            "catch_up": True,
+            "loop_count": 0,
+            "loop_gap": 0.1,
+            "max_duration": 0,
+            "display_fps": 20,
+            "simplify_tolerance": 0,
+            "simplify_max_gap": 0.1,
+            "adaptive_sampling": {
+                "enabled": False,
+                "min_interval": 0.004,
+                "max_interval": 0.1,
+                "distance": 8.0,
+                "angle": 20.0,
+                "jitter": 2.0
+            },
+            "optimizer": {
+                "passes": [],
+                "max_idle": 2.0,
+                "scroll_window": 0.1
+            },
+            "telemetry": {
+                "enabled": False,
+                "json_file": "telemetry.json",
+                "prometheus_file": "telemetry.prom",
+                "late_threshold": 0.005
+            },
+            "library": {
+                "directory": "macros",
+                "cache_size": 4,
+                "slot_keys": []
+            },
             "language": "zh",
             "theme": {
                 "title": "BRIGHT_MAGENTA",
@@ -35,12 +78,25 @@ class Settings:
                     self.config['hotkeys'].update(data['hotkeys'])
                 if 'theme' in data:
                     self.config['theme'].update(data['theme'])
-                for key in ['default_speed', 'macro_filename', 'sample_rate', 'language']:
+                if 'adaptive_sampling' in data:
+                    self.config['adaptive_sampling'].update(data['adaptive_sampling'])
+                if 'optimizer' in data:
+                    self.config['optimizer'].update(data['optimizer'])
+                if 'telemetry' in data:
+                    self.config['telemetry'].update(data['telemetry'])
+                if 'library' in data:
+                    self.config['library'].update(data['library'])
+                for key in ['default_speed', 'macro_filename', 'sample_rate', 'language',
+                            'journal_batch_size', 'journal_flush_interval', 'streaming_playback',
+                            'timing_mode', 'spin_threshold', 'realtime_priority',
+                            'simplify_tolerance', 'simplify_max_gap', 'hook_buffer_size',
+                            'display_fps', 'backend', 'uinput_screen_size', 'catch_up',
+                            'handoff_max_events', 'loop_count', 'loop_gap', 'max_duration']:
                     if key in data:
                         self.config[key] = data[key]
         except FileNotFoundError:
             self.first_run = True
-            print(f"未找到配置文件 {self.filename}，生成默认配置。")
+            print(f"未找到配置文件 {self.filename}，生成默认配置。", file=sys.stderr)
             self.save()
 
     def save(self):
@@ -0,0 +1,115 @@
+from array import array
+from bisect import bisect_right
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时不做路径简化
+    np = None
+
+import macrofile
+from macrofile import MacroData, COLUMNS
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _move_runs(types) -> List[Tuple[int, int]]:
+    # 找出连续 move 事件的区间 [start, end)
+    is_move = np.concatenate(([False], types == macrofile.MOVE, [False]))
+    edges = np.flatnonzero(np.diff(is_move.astype(np.int8)))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+def _rdp(xs, ys, keep, tolerance: float) -> None:
+    # 迭代式 Ramer–Douglas–Peucker；每段的点到线距离一次性向量化计算
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        x0, y0, x1, y1 = xs[first], ys[first], xs[last], ys[last]
+        px = xs[first + 1:last] - x0
+        py = ys[first + 1:last] - y0
+        dx, dy = x1 - x0, y1 - y0
+        length = np.hypot(dx, dy)
+        if length > 0:
+            dist = np.abs(px * dy - py * dx) / length
+        else:
+            dist = np.hypot(px, py)
+        i = int(np.argmax(dist))
+        if dist[i] <= tolerance:
+            continue
+        split = first + 1 + i
+        keep[split] = True
+        stack.append((first, split))
+        stack.append((split, last))
+
+
+def _fill_gaps(ts, keep, max_gap: float) -> None:
+    # 保留点之间超过 max_gap 时，贪心地补回尽量靠后的原始点，使间隔不超过 max_gap
+    kept = np.flatnonzero(keep)
+    wide = np.flatnonzero(np.diff(ts[kept]) > max_gap)
+    if not len(wide):
+        return
+    times = ts.tolist()
+    for k in wide.tolist():
+        cur, end = int(kept[k]), int(kept[k + 1])
+        while times[end] - times[cur] > max_gap:
+            nxt = bisect_right(times, times[cur] + max_gap, cur + 1, end) - 1
+            if nxt <= cur:
+                # 原始采样间隔本身超过 max_gap
+                nxt = cur + 1
+            if nxt >= end:
+                break
+            keep[nxt] = True
+            cur = nxt
+
+
+def simplify_moves(data: MacroData, tolerance: float, max_gap: float = 0.1) -> Tuple[MacroData, int]:
+    """简化点击、按键、滚轮之间的鼠标移动轨迹，返回 (新数据, 删除的事件数)。"""
+    if np is None or tolerance <= 0 or len(data) < 3:
+        return data, 0
+    types = np.frombuffer(data.types, dtype=np.uint8)
+    ts = np.frombuffer(data.times, dtype=np.float64)
+    xs = np.frombuffer(data.xs, dtype=np.int32).astype(np.float64)
+    ys = np.frombuffer(data.ys, dtype=np.int32).astype(np.float64)
+
+    # 非 move 事件以及每段移动的首尾始终保留
+    keep = types != macrofile.MOVE
+    for start, end in _move_runs(types):
+        keep[start] = True
+        keep[end - 1] = True
+        if end - start > 2:
+            _rdp(xs[start:end], ys[start:end], keep[start:end], tolerance)
+    # 回放时光标在保留点之间直接跳转，限制时间间隔以保持慢速拖动的节奏
+    if max_gap > 0:
+        _fill_gaps(ts, keep, max_gap)
+
+    removed = int(len(keep) - np.count_nonzero(keep))
+    if not removed:
+        return data, 0
+    columns = {}
+    for name, typecode, _ in COLUMNS:
+        column = np.frombuffer(getattr(data, name), dtype=typecode)
+        columns[name] = array(typecode, column[keep].tobytes())
+    return MacroData(columns, list(data.strings)), removed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simplify mouse paths in a macro file (Ramer-Douglas-Peucker)")
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    parser.add_argument('--tolerance', type=float, default=2.0, help="pixel tolerance")
+    parser.add_argument('--max-gap', type=float, default=0.1, help="maximum seconds between kept moves")
+    args = parser.parse_args()
+    if not available():
+        parser.error("numpy is required: pip install numpy")
+    source = macrofile.load(args.src)
+    result, removed = simplify_moves(source, args.tolerance, args.max_gap)
+    macrofile.save(args.dst, result)
+    print(f"removed {removed} of {len(source)} events: {args.src} -> {args.dst}")
+    source.close()
@@ -0,0 +1,58 @@
+import builtins
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+class StartupProfiler:
+    """启动耗时分析：记录首次导入各模块的耗时，以及各初始化阶段的耗时。"""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.enabled = False
+        self.imports: Dict[str, float] = {}
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.origin
+        self._local = threading.local()
+        self._import = builtins.__import__
+
+    def install(self) -> None:
+        self.enabled = True
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self) -> None:
+        builtins.__import__ = self._import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # 只统计最外层的首次导入，嵌套导入的耗时计入其上层模块
+        if level or name in sys.modules or getattr(self._local, 'depth', 0):
+            return self._import(name, globals, locals, fromlist, level)
+        self._local.depth = 1
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = 0
+            key = name if threading.current_thread() is threading.main_thread() else f"{name} (background)"
+            self.imports[key] = self.imports.get(key, 0.0) + time.perf_counter() - start
+
+    def mark(self, phase: str) -> None:
+        # 记录从上一个标记到现在的耗时
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        lines = ["Imports (first import, including dependencies):"]
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1]):
+            lines.append(f"  {seconds * 1000:8.1f} ms  {name}")
+        lines.append("Phases (duration, elapsed since start):")
+        elapsed = 0.0
+        for phase, seconds in self.phases:
+            elapsed += seconds
+            lines.append(f"  {seconds * 1000:8.1f} ms  {elapsed * 1000:8.1f} ms  {phase}")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,191 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+# 延迟直方图的桶上限 (秒)，最后一个桶收纳其余所有值
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# 后端接口的方法 -> 事件类型 (与宏文件中的类型名称一致)
+KINDS = {
+    'move': 'move',
+    'press_button': 'click',
+    'release_button': 'click',
+    'scroll': 'scroll',
+    'press_key': 'key_press',
+    'release_key': 'key_release',
+}
+
+
+class TypeStats:
+    __slots__ = ('buckets', 'count', 'total', 'max', 'late', 'errors')
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.late = 0
+        self.errors = 0
+
+
+class RunTelemetry:
+    """单次回放的遥测：各事件类型的延迟直方图、迟到与出错次数、吞吐量与每轮耗时。
+
+    回放线程每个事件只做一次二分查找与几次加法；结束后写出 JSON 与 Prometheus 文本格式。
+    """
+
+    def __init__(self, macro: str, late_threshold: float = 0.005, backend: Any = None) -> None:
+        self.macro = macro
+        self.late_threshold = late_threshold
+        self.types: Dict[str, TypeStats] = {}
+        self.loop_durations: List[float] = []
+        self.coalesced = 0
+        self.status = 'completed'
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._loop_start = self._start
+        self._end: Optional[float] = None
+        # 已绑定的后端方法 -> 统计，避免每个事件都查找类型
+        self._by_action: Dict[Callable, TypeStats] = {}
+        # 按后端的属性而不是方法名识别类型：pynput 后端的 press_button 等直接是控制器的 press / release
+        self._kinds: Dict[Callable, str] = {}
+        if backend is not None:
+            for attr, kind in KINDS.items():
+                self._kinds.setdefault(getattr(backend, attr), kind)
+
+    def _stats(self, action: Callable) -> TypeStats:
+        stats = self._by_action.get(action)
+        if stats is None:
+            kind = self._kinds.get(action) or KINDS.get(getattr(action, '__name__', ''), 'other')
+            stats = self.types.get(kind)
+            if stats is None:
+                stats = self.types[kind] = TypeStats()
+            self._by_action[action] = stats
+        return stats
+
+    def record(self, action: Callable, lateness: float) -> None:
+        # lateness: 开始执行时已超过截止时间的秒数 (提前唤醒时记为 0)
+        stats = self._by_action.get(action) or self._stats(action)
+        if lateness < 0:
+            lateness = 0.0
+        stats.buckets[bisect_left(BUCKETS, lateness)] += 1
+        stats.count += 1
+        stats.total += lateness
+        if lateness > stats.max:
+            stats.max = lateness
+        if lateness > self.late_threshold:
+            stats.late += 1
+
+    def error(self, action: Callable) -> None:
+        self._stats(action).errors += 1
+
+    def begin_loop(self) -> None:
+        self._loop_start = time.perf_counter()
+
+    def end_loop(self) -> None:
+        self.loop_durations.append(time.perf_counter() - self._loop_start)
+
+    def finish(self, status: str, coalesced: int = 0) -> None:
+        self._end = time.perf_counter()
+        self.status = status
+        self.coalesced = coalesced
+
+    @property
+    def duration(self) -> float:
+        return (self._end or time.perf_counter()) - self._start
+
+    @property
+    def events(self) -> int:
+        return sum(stats.count for stats in self.types.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        duration = self.duration
+        loops = self.loop_durations
+        return {
+            'macro': self.macro,
+            'status': self.status,
+            'started': round(self.started, 3),
+            'duration': round(duration, 6),
+            'events': self.events,
+            'events_per_second': round(self.events / duration, 1) if duration > 0 else 0.0,
+            'late_threshold': self.late_threshold,
+            'late': sum(stats.late for stats in self.types.values()),
+            'errors': sum(stats.errors for stats in self.types.values()),
+            'coalesced': self.coalesced,
+            'loops': {
+                'completed': len(loops),
+                'min': round(min(loops), 6) if loops else None,
+                'max': round(max(loops), 6) if loops else None,
+                'mean': round(sum(loops) / len(loops), 6) if loops else None,
+                'durations': [round(d, 6) for d in loops],
+            },
+            'types': {
+                kind: {
+                    'count': stats.count,
+                    'late': stats.late,
+                    'errors': stats.errors,
+                    'lateness_sum': round(stats.total, 6),
+                    'lateness_max': round(stats.max, 6),
+                    'lateness_buckets': {str(bound): n for bound, n in zip(BUCKETS + ('+Inf',), stats.buckets)},
+                }
+                for kind, stats in sorted(self.types.items())
+            },
+        }
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        macro = self.macro.replace('\\', '\\\\').replace('"', '\\"')
+        metric('macro_run_info', 'gauge', "Playback run information")
+        lines.append(f'macro_run_info{{macro="{macro}",status="{self.status}"}} 1')
+        metric('macro_run_start_timestamp_seconds', 'gauge', "Unix time the run started")
+        lines.append(f"macro_run_start_timestamp_seconds {self.started:.3f}")
+        metric('macro_run_duration_seconds', 'gauge', "Wall-clock duration of the run")
+        lines.append(f"macro_run_duration_seconds {self.duration:.6f}")
+        metric('macro_events_per_second', 'gauge', "Executed events per second of wall-clock time")
+        duration = self.duration
+        lines.append(f"macro_events_per_second {self.events / duration if duration > 0 else 0.0:.1f}")
+
+        metric('macro_event_lateness_seconds', 'histogram', "Lateness of executed events relative to their deadline")
+        for kind, stats in sorted(self.types.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += n
+                lines.append(f'macro_event_lateness_seconds_bucket{{type="{kind}",le="{bound}"}} {cumulative}')
+            lines.append(f'macro_event_lateness_seconds_sum{{type="{kind}"}} {stats.total:.6f}')
+            lines.append(f'macro_event_lateness_seconds_count{{type="{kind}"}} {stats.count}')
+        metric('macro_events_late_total', 'counter', f"Events started more than {self.late_threshold} s late")
+        for kind, stats in sorted(self.types.items()):
+            lines.append(f'macro_events_late_total{{type="{kind}"}} {stats.late}')
+        metric('macro_events_errors_total', 'counter', "Events whose backend call raised an error")
+        for kind, stats in sorted(self.types.items()):
+            lines.append(f'macro_events_errors_total{{type="{kind}"}} {stats.errors}')
+        metric('macro_events_coalesced_total', 'counter', "Stale mouse moves skipped by catch-up")
+        lines.append(f"macro_events_coalesced_total {self.coalesced}")
+
+        metric('macro_loop_duration_seconds', 'summary', "Wall-clock duration of completed loops")
+        lines.append(f"macro_loop_duration_seconds_sum {sum(self.loop_durations):.6f}")
+        lines.append(f"macro_loop_duration_seconds_count {len(self.loop_durations)}")
+        metric('macro_loop_duration_max_seconds', 'gauge', "Longest completed loop")
+        lines.append(f"macro_loop_duration_max_seconds {max(self.loop_durations, default=0.0):.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_file: Optional[str], prometheus_file: Optional[str]) -> None:
+        # 先写临时文件再替换，监控程序不会读到写了一半的文件
+        if json_file:
+            _write_atomic(json_file, json.dumps(self.as_dict(), indent=2, ensure_ascii=False) + "\n")
+        if prometheus_file:
+            _write_atomic(prometheus_file, self.prometheus())
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,105 @@
+import re
+from array import array
+from bisect import bisect_left
+from typing import Any, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import macrofile
+
+# 每隔多少个点击/按键事件保存一次按下状态
+CHECKPOINT_INTERVAL = 1024
+
+# 点击、按下与松开按键 (会改变按下状态的事件类型) 的字节模式
+_STATE_EVENTS = re.compile(b'[%c%c%c]' % (macrofile.CLICK, macrofile.KEY_PRESS, macrofile.KEY_RELEASE))
+# 带坐标 (决定光标位置) 的事件类型
+_POSITIONED = (bytes([macrofile.MOVE]), bytes([macrofile.CLICK]), bytes([macrofile.SCROLL]))
+
+
+class State(NamedTuple):
+    # 某个事件之前的光标位置 (未知时为 None) 与按下中的按键、鼠标按钮 (字符串表下标)
+    position: Optional[Tuple[int, int]]
+    keys: FrozenSet[int]
+    buttons: FrozenSet[int]
+
+
+class TimeIndex:
+    """宏的时间索引：按时间或事件序号定位，并给出该处的光标位置与按下状态。
+
+    时间列本身有序，定位直接二分查找；按下状态只随点击与按键变化，
+    建立索引时只遍历这些事件并每隔 CHECKPOINT_INTERVAL 个保存一次检查点，
+    检查点同时记录此前最后一个带坐标事件的序号，求光标位置时最多回溯一个检查点间隔。
+    """
+
+    def __init__(self, macro: Any, interval: int = CHECKPOINT_INTERVAL) -> None:
+        self.macro = macro
+        self.interval = max(1, interval)
+        self._types = bytes(macro.types)
+        # 改变按下状态的事件下标，由正则在 C 层扫描类型列得到，无需逐个遍历移动事件
+        self._changes = array('q', (m.start() for m in _STATE_EVENTS.finditer(self._types)))
+        # 检查点: (按下的按键, 按下的按钮, 该变化事件之前最后一个带坐标事件的序号，没有时为 -1)
+        self._checkpoints: List[Tuple[FrozenSet[int], FrozenSet[int], int]] = []
+        keys, buttons = set(), set()
+        positioned, previous = -1, 0
+        for k, i in enumerate(self._changes):
+            if k % self.interval == 0:
+                # 只在上一个检查点之后的区间内查找，建立索引的总开销与事件数成正比
+                found = max(self._types.rfind(b, previous, i) for b in _POSITIONED)
+                if found >= 0:
+                    positioned = found
+                previous = i
+                self._checkpoints.append((frozenset(keys), frozenset(buttons), positioned))
+            self._apply(i, keys, buttons)
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def _apply(self, i: int, keys: set, buttons: set) -> None:
+        type_code, code = self._types[i], self.macro.codes[i]
+        if type_code == macrofile.CLICK:
+            if self.macro.flags[i]:
+                buttons.add(code)
+            else:
+                buttons.discard(code)
+        elif type_code == macrofile.KEY_PRESS:
+            keys.add(code)
+        else:
+            keys.discard(code)
+
+    def event_at(self, position: float) -> int:
+        # 第一个不早于 position (相对首个事件的秒数) 的事件序号
+        return bisect_left(self.macro.times, self.macro.start_time + position)
+
+    def time_of(self, event: int) -> float:
+        # 事件相对首个事件的时间；超出末尾时为总时长
+        if event >= len(self._types):
+            return max(0.0, self.macro.duration - self.macro.start_time)
+        return self.macro.times[event] - self.macro.start_time
+
+    def first_at_same_time(self, event: int) -> int:
+        # 与该事件时间相同的第一个事件，保证从同一时刻开始时不会漏掉或重复事件
+        if event >= len(self._types):
+            return len(self._types)
+        return bisect_left(self.macro.times, self.macro.times[event], 0, event)
+
+    def state_at(self, event: int) -> State:
+        # 从该事件之前最近的检查点开始补算按下状态
+        event = min(event, len(self._types))
+        k = bisect_left(self._changes, event)
+        keys, buttons = set(), set()
+        floor, positioned = 0, -1
+        if k:
+            cp = min((k - 1) // self.interval, len(self._checkpoints) - 1)
+            held_keys, held_buttons, positioned = self._checkpoints[cp]
+            keys, buttons = set(held_keys), set(held_buttons)
+            start = cp * self.interval
+            floor = self._changes[start]
+            for j in range(start, k):
+                self._apply(self._changes[j], keys, buttons)
+        # 光标位置取之前最近一个带坐标的事件 (移动、点击或滚轮)；
+        # 检查点之后跳过的只有按键事件，最多一个检查点间隔，再往前直接取检查点记录的序号
+        j = event - 1
+        while j >= floor and self._types[j] > macrofile.SCROLL:
+            j -= 1
+        if j < floor:
+            j = positioned
+        position = (self.macro.xs[j], self.macro.ys[j]) if j >= 0 else None
+        return State(position, frozenset(keys), frozenset(buttons))
@@ -0,0 +1,123 @@
+import heapq
+import json
+import os
+from operator import itemgetter
+from typing import Any, Iterator, List, NamedTuple, Optional
+
+from macrofile import MacroFormatError
+from plan import PlaybackPlan, Step, LOOP_GAP
+
+# 时间线文件：{"tracks": [{"file": "a.json", "offset": 0, "speed": 1.0, "loops": 1}, ...]}
+# file 为相对路径时相对于时间线文件所在目录；offset 为时间线上的起始秒数
+# 顶层可选的 loops / gap / max_duration 指定整条时间线的循环次数、循环间隔与总时长上限
+TIMELINE_SUFFIX = '.timeline.json'
+
+
+class Track(NamedTuple):
+    plan: PlaybackPlan
+    offset: float = 0.0
+    speed: float = 1.0
+    loops: int = 1
+    gap: float = LOOP_GAP
+
+    @property
+    def span(self) -> float:
+        return max(0.0, self.plan.duration - self.plan.start_time)
+
+    @property
+    def end(self) -> float:
+        # 该轨道最后一个事件在时间线上的时间
+        return self.offset + (self.loops * self.span + (self.loops - 1) * self.gap) / self.speed
+
+
+class TimelinePlan:
+    """将多个轨道合并为一条回放计划，接口与 PlaybackPlan 相同。
+
+    各轨道按自己的偏移、速度与循环次数展开为有序步骤流，
+    迭代时用堆按截止时间惰性合并，所有轨道共用一个回放线程与同一组控制器。
+    """
+
+    def __init__(self, tracks: List[Track], backend: Any, loops: Optional[int] = None,
+                 loop_gap: Optional[float] = None, max_duration: Optional[float] = None) -> None:
+        self.tracks = tracks
+        self.backend = backend
+        # 各轨道计划各自绑定了 backend.move，合并时统一替换为此对象以便回放循环识别移动
+        self.move = backend.move
+        self.start_time = 0.0
+        self.duration = max((track.end for track in tracks), default=0.0)
+        self.invalid: List[str] = []
+        # 整条时间线的循环设置，None 表示使用本次回放参数或全局设置
+        self.loops = loops
+        self.loop_gap = loop_gap
+        self.max_duration = max_duration
+        for track in tracks:
+            for name in track.plan.invalid:
+                if name not in self.invalid:
+                    self.invalid.append(name)
+
+    def __bool__(self) -> bool:
+        return any(track.plan for track in self.tracks)
+
+    def __len__(self) -> int:
+        # 展开所有循环后的事件总数
+        return sum(len(track.plan.macro) * track.loops for track in self.tracks)
+
+    def __iter__(self) -> Iterator[Step]:
+        # heapq.merge 在截止时间相同时保持轨道顺序
+        return heapq.merge(*[self._expand(track) for track in self.tracks], key=itemgetter(0))
+
+    def _expand(self, track: Track) -> Iterator[Step]:
+        offset, speed, plan = track.offset, track.speed, track.plan
+        period = track.span + track.gap
+        source_move, move = plan.move, self.move
+        for loop in range(track.loops):
+            base = loop * period
+            for deadline, action, args in plan:
+                if action is source_move:
+                    action = move
+                yield (offset + (base + deadline) / speed, action, args)
+
+
+def is_timeline(filename: str) -> bool:
+    return filename.lower().endswith(TIMELINE_SUFFIX)
+
+
+def load_timeline(filename: str, cache: Any, backend: Any) -> TimelinePlan:
+    # 轨道宏经由缓存加载并复用已编译的计划；文件缺失时抛出 FileNotFoundError
+    with open(filename, 'r', encoding='utf-8') as f:
+        try:
+            spec = json.load(f)
+        except ValueError as e:
+            raise MacroFormatError(str(e))
+    if not isinstance(spec, dict) or not isinstance(spec.get('tracks'), list):
+        raise MacroFormatError("timeline needs a 'tracks' list")
+    base_dir = os.path.dirname(os.path.abspath(filename))
+    tracks = []
+    for item in spec['tracks']:
+        try:
+            path = os.path.join(base_dir, item['file'])
+            offset = float(item.get('offset', 0.0))
+            speed = float(item.get('speed', 1.0))
+            loops = int(item.get('loops', 1))
+            gap = float(item.get('gap', LOOP_GAP))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise MacroFormatError(f"invalid track {item!r}: {e}")
+        if speed <= 0 or loops < 1 or offset < 0 or gap < 0:
+            raise MacroFormatError(f"invalid track {item!r}")
+        entry = cache.get(path)
+        if entry.plan is None or entry.plan.backend is not backend:
+            entry.plan = PlaybackPlan(entry.data, backend)
+        tracks.append(Track(entry.plan, offset, speed, loops, gap))
+    try:
+        loops = spec.get('loops')
+        loops = None if loops is None else int(loops)
+        gap = spec.get('gap')
+        gap = None if gap is None else float(gap)
+        max_duration = spec.get('max_duration')
+        max_duration = None if max_duration is None else float(max_duration)
+    except (TypeError, ValueError) as e:
+        raise MacroFormatError(f"invalid timeline options: {e}")
+    if (loops is not None and loops < 0) or (gap is not None and gap < 0) \
+            or (max_duration is not None and max_duration < 0):
+        raise MacroFormatError("invalid timeline options")
+    return TimelinePlan(tracks, backend, loops, gap, max_duration)
@@ -0,0 +1,124 @@
+import os
+import platform
+import threading
+import time
+from typing import Optional
+
+TIMING_MODES = ('sleep', 'hybrid')
+
+
+class Timer:
+    """回放调度的等待策略。
+
+    sleep: 直接睡眠到目标时间，精度受系统调度粒度限制。
+    hybrid: 先睡眠到目标时间前 spin_threshold 秒，再忙等到目标时间。
+    两种模式都在 wake_event 被设置 (停止、变速、暂停) 时提前返回。
+    """
+
+    def __init__(self, mode: str = 'sleep', spin_threshold: float = 0.002,
+                 wake_event: Optional[threading.Event] = None) -> None:
+        self.mode = mode if mode in TIMING_MODES else 'sleep'
+        self.spin_threshold = max(0.0, spin_threshold)
+        self.wake_event = wake_event or threading.Event()
+
+    def wait_until(self, deadline: float) -> bool:
+        # deadline 为 time.perf_counter() 时间轴上的绝对时间；被提前唤醒时返回 True
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        if self.mode == 'sleep':
+            return self.wake_event.wait(remaining)
+        coarse = remaining - self.spin_threshold
+        if coarse > 0 and self.wake_event.wait(coarse):
+            return True
+        perf_counter = time.perf_counter
+        while perf_counter() < deadline:
+            pass
+        return False
+
+
+class PlaybackClock:
+    """回放虚拟时钟：宏时间 = 基准位置 + (当前时间 - 基准时间) * 速度。
+
+    变速与暂停时以当前位置重新设定基准，后续事件的截止时间因此不会停顿或突发。
+    """
+
+    def __init__(self, speed: float = 1.0) -> None:
+        self._lock = threading.Lock()
+        self._speed = speed
+        self._origin = time.perf_counter()
+        self._position = 0.0
+        self._paused = False
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def _rebase(self, now: float) -> None:
+        if not self._paused:
+            self._position += (now - self._origin) * self._speed
+        self._origin = now
+
+    def start(self, position: float = 0.0) -> None:
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._position = position
+            self._paused = False
+
+    def set_speed(self, speed: float) -> None:
+        with self._lock:
+            self._rebase(time.perf_counter())
+            self._speed = speed
+
+    def pause(self) -> None:
+        with self._lock:
+            if not self._paused:
+                self._rebase(time.perf_counter())
+                self._paused = True
+
+    def resume(self) -> None:
+        with self._lock:
+            if self._paused:
+                self._origin = time.perf_counter()
+                self._paused = False
+
+    def position(self) -> float:
+        with self._lock:
+            if self._paused:
+                return self._position
+            return self._position + (time.perf_counter() - self._origin) * self._speed
+
+    def deadline(self, position: float) -> Optional[float]:
+        # 返回到达指定宏时间的 perf_counter 绝对时间；暂停时返回 None
+        with self._lock:
+            if self._paused:
+                return None
+            return self._origin + (position - self._position) / self._speed
+
+
+def raise_thread_priority() -> Optional[str]:
+    # 仅在 Linux 上提升当前线程的调度优先级；权限不足时依次降级，返回实际生效的方式
+    if platform.system() != 'Linux':
+        return None
+    try:
+        param = os.sched_param(os.sched_get_priority_min(os.SCHED_FIFO))
+        os.sched_setscheduler(0, os.SCHED_FIFO, param)
+        return 'SCHED_FIFO'
+    except (AttributeError, PermissionError, OSError):
+        pass
+    try:
+        # Linux 上 PRIO_PROCESS 配合线程 ID 只影响当前线程
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+        return 'nice -10'
+    except (AttributeError, PermissionError, OSError):
+        return None
+
+
+def timer_from_settings(config: dict, wake_event: Optional[threading.Event] = None) -> Timer:
+    return Timer(config.get('timing_mode', 'sleep'),
+                 config.get('spin_threshold', 0.002),
+                 wake_event)
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+from cli import build_parser, main
+from display import display
+from settings import settings
+
+
+class NumericOptionsTest(unittest.TestCase):
+    def parse(self, *argv):
+        return build_parser().parse_args(['play', 'm.json'] + list(argv))
+
+    def test_out_of_range_values_are_usage_errors(self):
+        for argv in (('--loops', '-3'), ('--speed', '-2'), ('--speed', '0'), ('--interval', '0'),
+                     ('--gap', '-1'), ('--max-duration', '-1'), ('--start', '-0.5'), ('--speed', 'nan'),
+                     ('--loops', '1.5')):
+            with self.assertRaises(SystemExit) as raised, contextlib.redirect_stderr(io.StringIO()):
+                self.parse(*argv)
+            self.assertEqual(raised.exception.code, 2, argv)
+
+    def test_boundary_values_are_accepted(self):
+        args = self.parse('--loops', '0', '--gap', '0', '--max-duration', '0', '--start', '0', '--speed', '0.1')
+        self.assertEqual((args.loops, args.gap, args.max_duration, args.start, args.speed), (0, 0.0, 0.0, 0.0, 0.1))
+
+
+class InvalidKeysTest(unittest.TestCase):
+    def test_streamed_invalid_names_are_reported_when_done(self):
+        data = macrofile.MacroData()
+        data.append(0.0, macrofile.KEY_PRESS, name='a')
+        data.append(0.001, macrofile.KEY_PRESS, name='no_such_key')
+        data.append(0.002, macrofile.KEY_RELEASE, name='a')
+        saved = json.loads(json.dumps(settings.config))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'macro.json')
+            report = os.path.join(tmp, 'progress.jsonl')
+            macrofile.save(path, data)
+            settings.config['streaming_playback'] = True
+            try:
+                code = main(['play', path, '--no-tui', '--backend', 'null', '--progress', report])
+            finally:
+                settings.config.clear()
+                settings.config.update(saved)
+                display.enabled = True
+            with open(report, encoding='utf-8') as f:
+                done = [json.loads(line) for line in f][-1]
+        self.assertEqual(code, 0)
+        self.assertEqual(done['event'], 'done')
+        self.assertEqual(done['invalid_keys'], ['no_such_key'])
+
+
+if __name__ == '__main__':
+    unittest.main()
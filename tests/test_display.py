@@ -0,0 +1,49 @@
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from display import DisplayManager
+from settings import settings
+
+
+def _manager():
+    manager = DisplayManager()
+    manager.set_hotkeys(settings.config['hotkeys'])
+    return manager
+
+
+class RedrawTest(unittest.TestCase):
+    def test_invalidate_redraws_whole_screen(self):
+        manager = _manager()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            manager.render()
+            manager.update_progress(1, 10)
+            out.seek(0)
+            out.truncate()
+            manager.invalidate()
+        # 未调用其他更新，invalidate 自身即触发整屏重绘
+        self.assertTrue(out.getvalue().startswith("\033[H"))
+
+    def test_periodic_full_redraw(self):
+        manager = _manager()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            manager.render()
+            out.seek(0)
+            out.truncate()
+            manager.update_progress(1, 10)
+            self.assertFalse(out.getvalue().startswith("\033[H"))
+            manager.full_redraw_interval = 0.0
+            out.seek(0)
+            out.truncate()
+            manager.update_progress(2, 10)
+        self.assertTrue(out.getvalue().startswith("\033[H"))
+
+
+if __name__ == '__main__':
+    unittest.main()
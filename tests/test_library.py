@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+from library import MacroCache, MacroLibrary
+
+
+def _macro(x):
+    data = macrofile.MacroData()
+    data.append(0.0, macrofile.MOVE, x, x)
+    data.append(0.1, macrofile.KEY_PRESS, name='a')
+    return data
+
+
+class OverwriteMappedMacroTest(unittest.TestCase):
+    def test_put_closes_mapping_and_save_replaces_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'macro.bin')
+            macrofile.save(path, _macro(1))
+            cache = MacroCache()
+            old = cache.get(path).data
+            self.assertIsInstance(old, macrofile.BinaryMacro)
+
+            new = _macro(2)
+            entry = cache.put(path, new)
+            # 被替换的 mmap 已关闭，不会在文件被覆盖后再被访问
+            self.assertIsNone(old._mm)
+            macrofile.save(path, new)
+            cache.commit(entry)
+
+            self.assertEqual(os.listdir(tmp), ['macro.bin'])
+            reloaded = macrofile.load(path)
+            self.assertEqual(reloaded.xs[0], 2)
+            reloaded.close()
+
+    def test_invalidate_closes_mapping(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'macro.bin')
+            macrofile.save(path, _macro(1))
+            cache = MacroCache()
+            data = cache.get(path).data
+            cache.invalidate(path)
+            self.assertIsNone(data._mm)
+            self.assertEqual(len(cache), 0)
+
+
+class LibrarySlotTest(unittest.TestCase):
+    def test_slot_skips_timelines_and_parses_nothing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ('a.json', 'b.bin', 'combo.timeline.json'):
+                macrofile.save(os.path.join(tmp, name), _macro(1))
+            cache = MacroCache()
+            library = MacroLibrary(tmp, cache)
+            self.assertEqual(library.slot(1), os.path.join(tmp, 'a.json'))
+            self.assertEqual(library.slot(2), os.path.join(tmp, 'b.bin'))
+            self.assertIsNone(library.slot(3))
+            # 选择槽位不经过缓存解析任何文件
+            self.assertEqual(len(cache), 0)
+            self.assertEqual([entry['name'] for entry in library.scan()], ['a.json', 'b.bin'])
+            self.assertEqual(len(cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
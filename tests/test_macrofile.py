@@ -0,0 +1,128 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+
+
+def _macro(count=300):
+    # 覆盖所有事件类型、负坐标与非 ASCII 名称；压缩格式以整数微秒保存时间，因此时间取整微秒
+    data = macrofile.MacroData()
+    for i in range(count):
+        t = i * 12500 / 1e6
+        m = i % 6
+        if m == 0:
+            data.append(t, macrofile.CLICK, i, -i, 'left', True)
+        elif m == 1:
+            data.append(t, macrofile.CLICK, i, -i, 'left', False)
+        elif m == 2:
+            data.append(t, macrofile.SCROLL, i, -i, dx=1, dy=-3)
+        elif m == 3:
+            data.append(t, macrofile.KEY_PRESS, name='é' if i % 4 else 'shift')
+        elif m == 4:
+            data.append(t, macrofile.KEY_RELEASE, name='é' if i % 4 else 'shift')
+        else:
+            data.append(t, macrofile.MOVE, 1920 - i, i * 7)
+    return data
+
+
+class FormatTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def round_trip(self, name):
+        # JSON -> 目标格式 -> JSON，事件列表保持不变
+        source = self.path('source.json')
+        target = self.path(name)
+        back = self.path('back.json')
+        macrofile.save(source, _macro())
+        macrofile.convert(source, target)
+        macrofile.convert(target, back)
+        with open(source) as f, open(back) as g:
+            self.assertEqual(f.read(), g.read())
+        loaded = macrofile.load(target)
+        self.assertEqual(loaded.to_events(), macrofile.load(source).to_events())
+        loaded.close()
+        return target
+
+    def corrupt(self, name, content):
+        path = self.path(name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def assertRejected(self, path, *readers):
+        for reader in readers:
+            with self.assertRaises(macrofile.MacroFormatError, msg=reader.__name__):
+                result = reader(path)
+                # 流式读取器在遍历时才读取事件
+                list(result)
+
+
+class BinaryFormatTest(FormatTestCase):
+    def test_round_trip(self):
+        path = self.round_trip('macro.bin')
+        self.assertTrue(macrofile.is_binary(path))
+        stream = macrofile.BinaryStream(path, chunk_size=7)
+        self.assertEqual(list(stream), list(macrofile.load(path)))
+        stream.close()
+
+    def test_bad_magic(self):
+        macrofile.write_binary(self.path('macro.bin'), _macro())
+        with open(self.path('macro.bin'), 'rb') as f:
+            raw = f.read()
+        path = self.corrupt('bad.bin', b'XXXX' + raw[4:])
+        self.assertRejected(path, macrofile.load, macrofile.BinaryMacro, macrofile.BinaryStream)
+
+    def test_truncated(self):
+        macrofile.write_binary(self.path('macro.bin'), _macro())
+        with open(self.path('macro.bin'), 'rb') as f:
+            raw = f.read()
+        for size in (0, 10, len(raw) // 2, len(raw) - 3):
+            path = self.corrupt('truncated.bin', raw[:size])
+            self.assertRejected(path, macrofile.BinaryMacro, macrofile.BinaryStream)
+
+
+class CompressedFormatTest(FormatTestCase):
+    def test_round_trip(self):
+        path = self.round_trip('macro.mcrz')
+        self.assertTrue(macrofile.is_compressed(path))
+        for codec in macrofile.CODECS:
+            # 多于一个块的宏，覆盖块之间的增量状态
+            data = _macro(macrofile.BLOCK_EVENTS * 2 + 5)
+            target = self.path(f'{codec}.mcrz')
+            macrofile.write_compressed(target, data, codec)
+            self.assertEqual(list(macrofile.CompressedStream(target)), list(data), codec)
+            self.assertEqual(macrofile.load(target).to_events(), data.to_events(), codec)
+
+    def test_bad_magic(self):
+        macrofile.write_compressed(self.path('macro.mcrz'), _macro())
+        with open(self.path('macro.mcrz'), 'rb') as f:
+            raw = f.read()
+        path = self.corrupt('bad.mcrz', b'XXXX' + raw[4:])
+        self.assertRejected(path, macrofile.load, macrofile.CompressedStream)
+
+    def test_truncated(self):
+        for codec in macrofile.CODECS:
+            macrofile.write_compressed(self.path('macro.mcrz'), _macro(), codec)
+            with open(self.path('macro.mcrz'), 'rb') as f:
+                raw = f.read()
+            for size in (0, 10, len(raw) // 2, len(raw) - 3):
+                path = self.corrupt('truncated.mcrz', raw[:size])
+                self.assertRejected(path, macrofile.CompressedStream)
+                if size:
+                    self.assertRejected(path, macrofile.load)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+from display import display
+from i18n import t
+from journal import journal_path
+from recorder import MacroRecorder
+from sampler import MoveSampler
+from settings import settings
+
+
+class _Key:
+    def __init__(self, char):
+        self.char = char
+
+
+def _recorder():
+    recorder = MacroRecorder()
+    recorder.journal = None
+    recorder.sampler = MoveSampler(min_interval=0.004, max_interval=0.1, distance=8.0)
+    recorder.start_time = 0.0
+    recorder.stop_key = 'f8'
+    return recorder
+
+
+def _push_moves(recorder):
+    # 第一个移动被记录，其后的小位移在 min_interval 内到达，全部被采样跳过
+    recorder.hook_buffer.push(0.010, macrofile.MOVE, 100, 100)
+    recorder.hook_buffer.push(0.011, macrofile.MOVE, 103, 100)
+    recorder.hook_buffer.push(0.012, macrofile.MOVE, 106, 101)
+
+
+def _moves(data):
+    return [(row[2], row[3]) for row in data if row[1] == macrofile.MOVE]
+
+
+class FinalMoveTest(unittest.TestCase):
+    def test_move_before_key_press_is_kept(self):
+        recorder = _recorder()
+        _push_moves(recorder)
+        recorder.hook_buffer.push(0.050, macrofile.KEY_PRESS, _Key('a'))
+        for item in recorder.hook_buffer.drain():
+            recorder._consume(item)
+        events = list(recorder.events)
+        self.assertEqual(_moves(events), [(100, 100), (106, 101)])
+        # 补记的落点位于按键之前
+        self.assertEqual(events[-1][1], macrofile.KEY_PRESS)
+
+    def test_move_at_end_of_recording_is_kept(self):
+        saved = dict(settings.config)
+        display.disable()
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.config['macro_filename'] = os.path.join(tmp, 'macro.json')
+            try:
+                recorder = _recorder()
+                recorder.recording = True
+                _push_moves(recorder)
+                recorder._consumer = threading.Thread(target=recorder._consume_loop)
+                recorder._consumer.start()
+                recorder.stop()
+                data = macrofile.load(settings.config['macro_filename'])
+            finally:
+                settings.config.clear()
+                settings.config.update(saved)
+        self.assertEqual(_moves(data), [(100, 100), (106, 101)])
+
+
+class PrepareTest(unittest.TestCase):
+    def test_simplify_runs_once(self):
+        import optimize
+        calls = []
+        saved_config, saved_pass = dict(settings.config), optimize.PASSES['simplify']
+        display.disable()
+        optimize.register_pass('simplify', lambda data, options: calls.append(options['simplify_tolerance']) or data)
+        try:
+            settings.config['simplify_tolerance'] = 3.0
+            for passes in ([], ['idle'], ['idle', 'simplify']):
+                del calls[:]
+                settings.config['optimizer'] = {'passes': passes}
+                recorder = _recorder()
+                recorder.events.append(0.0, macrofile.MOVE, 1, 1)
+                recorder._prepare(None)
+                self.assertEqual(calls, [3.0], passes)
+        finally:
+            optimize.register_pass('simplify', saved_pass)
+            settings.config.clear()
+            settings.config.update(saved_config)
+
+
+class RecoverTest(unittest.TestCase):
+    def test_corrupt_journal_is_moved_aside(self):
+        saved = dict(settings.config)
+        display.disable()
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.config['macro_filename'] = os.path.join(tmp, 'macro.json')
+            path = journal_path(settings.config['macro_filename'])
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write('{"journal": 1, "tar')
+                MacroRecorder().recover()
+            finally:
+                settings.config.clear()
+                settings.config.update(saved)
+            self.assertEqual(os.listdir(tmp), [os.path.basename(path) + '.corrupt'])
+            self.assertEqual(display.status, t('status.recover_failed', path=path + '.corrupt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
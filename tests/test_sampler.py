@@ -0,0 +1,36 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sampler import MoveSampler
+
+
+def _slow_jittery_path(count=3000, interval=0.004, jitter=1.5, seed=3):
+    # 约 75 px/s 的缓慢移动，叠加手部抖动，每 4 ms 一个原始事件
+    rng = random.Random(seed)
+    t, x, y = 0.0, 500.0, 500.0
+    for _ in range(count):
+        t += interval
+        x += 0.3
+        y += 0.1
+        yield round(x + rng.uniform(-jitter, jitter)), round(y + rng.uniform(-jitter, jitter)), t
+
+
+class SlowMotionTest(unittest.TestCase):
+    def test_fewer_moves_than_fixed_rate(self):
+        sampler = MoveSampler()
+        adaptive = sum(sampler.accept(x, y, t) for x, y, t in _slow_jittery_path())
+        # 录制器默认的固定间隔采样 (sample_rate = 0.016)
+        fixed, last = 0, None
+        for _, _, t in _slow_jittery_path():
+            if last is None or t - last >= 0.016:
+                fixed += 1
+                last = t
+        self.assertLess(adaptive, fixed / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+from display import display
+from plan import PlaybackPlan
+from settings import settings
+from telemetry import RunTelemetry
+
+
+class _Controller:
+    # 与 pynput 控制器相同：按下与松开的方法名是 press / release
+    def press(self, value):
+        pass
+
+    def release(self, value):
+        pass
+
+    def scroll(self, dx, dy):
+        pass
+
+
+class PynputShapedBackend:
+    """与 PynputBackend 结构相同的后端，按钮与按键方法直接绑定到控制器。"""
+
+    def __init__(self):
+        self.mouse = _Controller()
+        self.keyboard = _Controller()
+        self.press_button = self.mouse.press
+        self.release_button = self.mouse.release
+        self.scroll = self.mouse.scroll
+        self.press_key = self.keyboard.press
+        self.release_key = self.keyboard.release
+
+    def resolve_key(self, name):
+        return name or None
+
+    def resolve_button(self, name):
+        return name or 'left'
+
+    def move(self, x, y):
+        pass
+
+    def close(self):
+        pass
+
+
+def _macro():
+    data = macrofile.MacroData()
+    data.append(0.000, macrofile.MOVE, 1, 1)
+    data.append(0.001, macrofile.CLICK, 1, 1, 'left', True)
+    data.append(0.002, macrofile.CLICK, 1, 1, 'left', False)
+    data.append(0.003, macrofile.SCROLL, 1, 1, dy=-1)
+    data.append(0.004, macrofile.KEY_PRESS, name='a')
+    data.append(0.005, macrofile.KEY_RELEASE, name='a')
+    return data
+
+
+class TelemetryKindTest(unittest.TestCase):
+    def test_plan_steps_are_classified_by_backend_attribute(self):
+        backend = PynputShapedBackend()
+        plan = PlaybackPlan(_macro(), backend)
+        telemetry = RunTelemetry('test', backend=backend)
+        for _, action, _ in plan:
+            telemetry.record(action, 0.0)
+        self.assertEqual(sorted(telemetry.types), ['click', 'key_press', 'key_release', 'move', 'scroll'])
+        self.assertEqual(telemetry.types['click'].count, 2)
+
+    def test_player_reports_every_type(self):
+        from player import MacroPlayer
+
+        display.disable()
+        options = settings.config['telemetry']
+        saved = dict(options)
+        options.update(enabled=True, json_file=None, prometheus_file=None)
+        try:
+            player = MacroPlayer()
+            player._backend = PynputShapedBackend()
+            player.plan = PlaybackPlan(_macro(), player._backend)
+            player.loops = 1
+            player.playing = True
+            player._play_loop()
+        finally:
+            options.clear()
+            options.update(saved)
+        report = player.telemetry.as_dict()
+        self.assertEqual(sorted(report['types']), ['click', 'key_press', 'key_release', 'move', 'scroll'])
+        self.assertNotIn('other', report['types'])
+        self.assertEqual(report['events'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
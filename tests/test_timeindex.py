@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import macrofile
+from timeindex import TimeIndex
+
+
+def _random_macro(n, seed, weights):
+    # weights: 移动、点击、滚轮、按键各自的相对频率
+    rng = random.Random(seed)
+    data = macrofile.MacroData()
+    t = 0.0
+    for i in range(n):
+        t += rng.choice((0.0, 0.01))
+        kind = rng.choices(('move', 'click', 'scroll', 'key'), weights)[0]
+        if kind == 'move':
+            data.append(t, macrofile.MOVE, i, -i)
+        elif kind == 'click':
+            data.append(t, macrofile.CLICK, i, -i, rng.choice(('left', 'right')), rng.random() < 0.5)
+        elif kind == 'scroll':
+            data.append(t, macrofile.SCROLL, i, -i, dy=1)
+        else:
+            data.append(t, rng.choice((macrofile.KEY_PRESS, macrofile.KEY_RELEASE)), name=rng.choice('abc'))
+    return data
+
+
+def _replay(data, event):
+    # 逐个事件重放得到的参考状态
+    position, keys, buttons = None, set(), set()
+    for t, type_code, x, y, code, pressed, dx, dy in list(data)[:event]:
+        if type_code <= macrofile.SCROLL:
+            position = (x, y)
+        if type_code == macrofile.CLICK:
+            (buttons.add if pressed else buttons.discard)(code)
+        elif type_code == macrofile.KEY_PRESS:
+            keys.add(code)
+        elif type_code == macrofile.KEY_RELEASE:
+            keys.discard(code)
+    return position, keys, buttons
+
+
+class StateAtTest(unittest.TestCase):
+    def check(self, data, interval):
+        index = TimeIndex(data, interval)
+        for event in range(len(data) + 2):
+            position, keys, buttons = _replay(data, event)
+            state = index.state_at(event)
+            self.assertEqual(state.position, position, event)
+            self.assertEqual(state.keys, keys, event)
+            self.assertEqual(state.buttons, buttons, event)
+
+    def test_matches_replay(self):
+        for seed, weights in enumerate(((8, 1, 1, 2), (1, 0, 0, 20), (0, 0, 0, 1), (1, 0, 0, 0), (1, 3, 1, 3))):
+            for interval in (1, 3, 16):
+                self.check(_random_macro(300, seed, weights), interval)
+
+    def test_keyboard_only_seek_scans_one_interval(self):
+        data = _random_macro(20000, 7, (0, 0, 0, 1))
+        data.append(400.0, macrofile.MOVE, 5, 5)
+        for _ in range(20000):
+            data.append(401.0, macrofile.KEY_PRESS, name='a')
+        index = TimeIndex(data, 64)
+        reads = []
+        types = index._types
+
+        class CountingTypes(bytes):
+            def __getitem__(self, i):
+                reads.append(i)
+                return bytes.__getitem__(self, i)
+
+        index._types = CountingTypes(types)
+        self.assertEqual(index.state_at(len(data)).position, (5, 5))
+        # 补算按下状态与回溯光标位置各至多一个检查点间隔，而不是回溯到最后一次移动
+        self.assertLessEqual(len(reads), 2 * 64 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()